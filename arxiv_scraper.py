@@ -1,17 +1,143 @@
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 import re
-import os
+import threading
 from urllib.parse import urljoin, quote
-import time
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from probe_cache import ProbeCache
+from watermark_store import WatermarkStore
+from paper import Paper
+from http_client import get_shared_client
+from pdf_downloader import PdfDownloader
+
+# lxmlが使える場合は高速なlxmlパーサーを使う
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
 
 class ArxivScraper:
-    def __init__(self):
+    # arXivソースから探す、よくある画像ファイル名
+    COMMON_IMAGE_NAMES = [
+        "figure1.png", "figure2.png", "figure3.png",
+        "fig1.png", "fig2.png", "fig3.png",
+        "image1.png", "image2.png", "image3.png",
+        "plot1.png", "plot2.png", "plot3.png"
+    ]
+    
+    # 1論文あたりの最大画像数
+    MAX_IMAGES = 5
+    
+    def __init__(self, figure_workers=4, html_timeout=15, figure_batch_timeout=60,
+                 probe_workers=6, probe_cache=None, watermark_store=None, http_client=None):
         self.base_url = "https://export.arxiv.org/api/query"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        
+        # 図表抽出の並列数とタイムアウト
+        self.figure_workers = figure_workers
+        self.html_timeout = html_timeout
+        self.figure_batch_timeout = figure_batch_timeout
+        
+        # 共通HTTPクライアント（コネクション再利用・ホストごとのレート制限・リトライ）
+        self.http = http_client if http_client is not None else get_shared_client()
+        
+        # 画像URLの存在確認（並列数と結果キャッシュ）
+        # 論文ごとの確認は図表抽出の各スレッドから並列に走るため、同時に送るHEADは全体でprobe_workers件までにする
+        # （figure_workers + probe_workers が共有クライアントのpool_size以下なら接続を使い捨てない）
+        self.probe_workers = probe_workers
+        self._probe_slots = threading.BoundedSemaphore(probe_workers)
+        self.probe_cache = probe_cache if probe_cache is not None else ProbeCache()
+        
+        # 差分取得用のキーワードごとのウォーターマーク
+        self.watermark_store = watermark_store if watermark_store is not None else WatermarkStore()
+        
+        # 保存先ごとのPDFダウンローダー（ホストごとの同時接続数と対応表を呼び出し間で共有）
+        self._pdf_downloaders = {}
+        self._pdf_downloaders_lock = threading.Lock()
+    
+    # 気象・地球物理学カテゴリ
+    TARGET_CATEGORIES = ['physics.ao-ph', 'physics.geo-ph']
+    
+    # arXiv API 1リクエストあたりの最大取得件数
+    API_PAGE_SIZE = 100
+    
+    # 差分取得で使うソート項目と、対応する論文情報のキー
+    DATE_FIELDS = {
+        'submittedDate': 'published',
+        'lastUpdatedDate': 'updated'
+    }
+    
+    def build_search_query(self, query):
+        """キーワード1つ分の検索式を作成"""
+        # 気象・地球科学に関連するカテゴリも含めて検索
+        categories = ' OR '.join(f'cat:{category}' for category in self.TARGET_CATEGORIES)
+        search_terms = [
+            f'ti:"{query}"',  # タイトルに完全一致
+            f'abs:"{query}"',  # アブストラクトに完全一致
+            f'({categories}) AND all:{query}'  # 気象・地球物理学カテゴリ
+        ]
+        return ' OR '.join(search_terms)
+    
+    def matches_query(self, paper, query):
+        """論文がキーワードの検索式に該当するかをローカルで判定"""
+        phrase = query.lower()
+        title = paper.get('title', '').lower()
+        abstract = paper.get('abstract', '').lower()
+        
+        if phrase in title or phrase in abstract:
+            return True
+        
+        # カテゴリ一致 + キーワードの全単語を含む
+        in_category = any(category in self.TARGET_CATEGORIES for category in paper.get('categories', []))
+        text = title + ' ' + abstract
+        return in_category and all(word in text for word in phrase.split())
+    
+    def iter_papers(self, search_query, max_results, sort_by='relevance'):
+        """検索結果をページングしながら逐次パースし、論文情報を1件ずつ返す（画像なし）"""
+        # Namespace定義
+        ns = {
+            'atom': 'http://www.w3.org/2005/Atom',
+            'arxiv': 'http://arxiv.org/schemas/atom'
+        }
+        entry_tag = f"{{{ns['atom']}}}entry"
+        start = 0
+        
+        while start < max_results:
+            page_size = min(self.API_PAGE_SIZE, max_results - start)
+            params = {
+                'search_query': search_query,
+                'start': start,
+                'max_results': page_size,
+                'sortBy': sort_by,
+                'sortOrder': 'descending'
+            }
+            
+            entry_count = 0
+            with self.http.get(self.base_url, params=params, stream=True) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                
+                # XMLをストリームで解析（entryごとに処理して破棄）
+                root = None
+                for event, elem in ET.iterparse(response.raw, events=('start', 'end')):
+                    if root is None:
+                        root = elem
+                    if event == 'end' and elem.tag == entry_tag:
+                        entry_count += 1
+                        yield self.extract_paper_info_from_xml(elem, ns)
+                        root.remove(elem)
+            
+            # 最終ページ
+            if entry_count < page_size:
+                break
+            start += page_size
+    
+    def fetch_papers(self, search_query, max_results, sort_by='relevance'):
+        """検索式でarXiv APIを呼び出し、論文情報のリストを取得（画像なし）"""
+        return list(self.iter_papers(search_query, max_results, sort_by))
     
     def search_papers(self, query, max_results=5):
         """arXivで論文を検索し、詳細情報を取得"""
@@ -19,54 +145,146 @@ class ArxivScraper:
         
         try:
             # arXiv APIで検索（関連性順にソート、気象・地球科学関連カテゴリを優先）
-            # 気象・地球科学に関連するカテゴリも含めて検索
-            search_terms = [
-                f'ti:"{query}"',  # タイトルに完全一致
-                f'abs:"{query}"',  # アブストラクトに完全一致
-                f'(cat:physics.ao-ph OR cat:physics.geo-ph) AND all:{query}'  # 気象・地球物理学カテゴリ
-            ]
+            # パースできた論文から順に画像取得を開始する
+            papers = self.attach_images(self.iter_papers(self.build_search_query(query), max_results))
+                
+        except Exception as e:
+            print(f"arXiv検索エラー: {e}")
             
-            params = {
-                'search_query': ' OR '.join(search_terms),
-                'start': 0,
-                'max_results': max_results,
-                'sortBy': 'relevance',  # 関連性順
-                'sortOrder': 'descending'
-            }
+        return papers
+    
+    def search_new_papers(self, query, max_results=1000, sort_by='submittedDate'):
+        """前回実行以降に投稿・更新された論文のみを取得（差分取得、画像なし）
+
+        (論文のリスト, ウォーターマークまで取得できたか) を返す。
+        ウォーターマークは進めないので、処理が終わったらcommit_watermarkを呼ぶ。
+        """
+        papers = []
+        date_key = self.DATE_FIELDS[sort_by]
+        since = self.watermark_store.get(f"{sort_by}:{query}")
+        # 初回（ウォーターマークなし）は最新のmax_results件で完了とする
+        complete = not since
+        
+        try:
+            # 日付の新しい順に取得し、ウォーターマークより古い論文に達したらページングを止める
+            # （同日分は再取得されるが、重複チェックで除外される）
+            for paper in self.iter_papers(self.build_search_query(query), max_results, sort_by):
+                if since and paper.get(date_key, '') < since:
+                    complete = True
+                    break
+                papers.append(paper)
+            else:
+                # 最後のページまで取得した（max_results件に満たない）
+                if len(papers) < max_results:
+                    complete = True
             
-            response = requests.get(self.base_url, params=params)
-            response.raise_for_status()
+            print(f"📅 {len(papers)} papers since {since or 'the beginning'} for '{query}'")
+            if not complete:
+                print(f"⚠️ More than {max_results} new papers for '{query}', watermark is kept until they are all fetched")
             
-            # XMLを解析
-            root = ET.fromstring(response.content)
+        except Exception as e:
+            # 途中までの結果ではウォーターマークを進めない
+            print(f"arXiv差分検索エラー: {e}")
+            complete = False
             
-            # Namespace定義
-            ns = {
-                'atom': 'http://www.w3.org/2005/Atom',
-                'arxiv': 'http://arxiv.org/schemas/atom'
-            }
+        return papers, complete
+    
+    def commit_watermark(self, query, papers, pending=(), complete=True, sort_by='submittedDate'):
+        """差分取得した論文の処理後にウォーターマークを進める
+
+        papersはsearch_new_papersの結果、pendingはそのうちまだ処理していない論文
+        （関連はあるが上位件数や1日の上限で選ばれなかったもの）。
+        処理していない論文があれば、その中で最も古い日付までしか進めないので、次回もう一度取得される。
+        ウォーターマークまで取得できなかった場合（completeがFalse）は進めない。
+        """
+        if not complete:
+            print(f"⏸️ Watermark for '{query}' not advanced (fetch did not reach it)")
+            return
+        
+        date_key = self.DATE_FIELDS[sort_by]
+        pending_dates = [paper.get(date_key, '') for paper in pending]
+        if pending_dates:
+            mark = min(pending_dates)
+        else:
+            mark = max((paper.get(date_key, '') for paper in papers), default=None)
+        
+        if mark:
+            self.watermark_store.advance(f"{sort_by}:{query}", mark)
+            self.watermark_store.save()
+    
+    def search_papers_batch(self, queries, max_results_per_query=5, max_pages=3, fetched=None):
+        """複数キーワードをまとめて1回の検索で取得し、キーワードごとに振り分ける
+
+        該当する論文の多いキーワードが結果を占めてしまわないように、
+        全キーワードに必要な数が集まるか、max_pagesページに達するまでページングする。
+        fetchedにリストを渡すと、振り分けられなかった論文も含めて取得した全論文を追加する。
+        """
+        results = {query: [] for query in queries}
+        if not queries:
+            return results
+        
+        try:
+            # 全キーワードの検索式をORで結合（API呼び出し回数はキーワード数に依存しない）
+            combined_query = ' OR '.join(f'({self.build_search_query(query)})' for query in queries)
+            max_results = max(max_results_per_query * len(queries), self.API_PAGE_SIZE * max_pages)
             
-            entries = root.findall('atom:entry', ns)
+            # 届いた論文から順にローカルでキーワードごとに振り分け
+            fetched_count = 0
+            for paper in self.iter_papers(combined_query, max_results):
+                fetched_count += 1
+                if fetched is not None:
+                    fetched.append(paper)
+                for query in queries:
+                    if len(results[query]) < max_results_per_query and self.matches_query(paper, query):
+                        results[query].append(paper)
+                if all(len(query_papers) >= max_results_per_query for query_papers in results.values()):
+                    break
+            print(f"📦 Batch search: {fetched_count} papers fetched for {len(queries)} keywords")
             
-            for entry in entries:
-                paper = self.extract_paper_info_from_xml(entry, ns)
-                
-                # HTMLページから画像を取得
-                images = self.extract_images_from_html(paper['url'])
+            # 振り分けられた論文のみ画像を取得（複数キーワードに該当する論文は1回だけ）
+            assigned = {}
+            for query_papers in results.values():
+                for paper in query_papers:
+                    assigned[id(paper)] = paper
+            self.attach_images(list(assigned.values()))
+            
+        except Exception as e:
+            print(f"arXivバッチ検索エラー: {e}")
+            
+        return results
+    
+    def attach_images(self, papers):
+        """複数論文の図表を並列に取得して各paperに追加（順序は維持）
+
+        papersにはジェネレータも渡せる。届いた論文から順に画像取得を開始する。
+        """
+        results = []
+        futures = []
+        
+        executor = ThreadPoolExecutor(max_workers=self.figure_workers)
+        try:
+            for paper in papers:
+                results.append(paper)
+                futures.append(executor.submit(self.extract_images_from_html, paper['url']))
+            
+            # 遅いページがあっても全体を待たせすぎない
+            done, _ = wait(futures, timeout=self.figure_batch_timeout)
+            
+            for paper, future in zip(results, futures):
+                if future not in done:
+                    print(f"⚠️ 画像抽出タイムアウト: {paper['url']}")
+                    continue
+                images = future.result()
                 if images:
                     paper['images'] = images
-                
-                papers.append(paper)
-                time.sleep(1)  # レート制限対策
-                
-        except Exception as e:
-            print(f"arXiv検索エラー: {e}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
             
-        return papers
+        return results
     
     def extract_paper_info_from_xml(self, entry, ns):
         """XMLエントリから論文情報を抽出"""
-        paper = {}
+        paper = Paper()
         
         # タイトル
         title_elem = entry.find('atom:title', ns)
@@ -78,8 +296,7 @@ class ArxivScraper:
             name_elem = author.find('atom:name', ns)
             if name_elem is not None:
                 authors.append(name_elem.text)
-        paper['authors'] = authors
-        paper['authors_str'] = ', '.join(authors)
+        paper['authors'] = authors  # authors_strは参照時に生成
         
         # Abstract
         summary_elem = entry.find('atom:summary', ns)
@@ -97,9 +314,7 @@ class ArxivScraper:
         id_elem = entry.find('atom:id', ns)
         paper['url'] = id_elem.text if id_elem is not None else ''
         
-        # arXiv ID
-        if paper['url']:
-            paper['arxiv_id'] = paper['url'].split('/')[-1]
+        # arXiv IDはURLから参照時に生成
         
         # PDF URL
         for link in entry.findall('atom:link', ns):
@@ -113,8 +328,7 @@ class ArxivScraper:
             term = category.get('term')
             if term:
                 categories.append(term)
-        paper['categories'] = categories
-        paper['primary_category'] = categories[0] if categories else ''
+        paper['categories'] = categories  # primary_categoryは先頭のカテゴリ
         
         # DOI
         doi_elem = entry.find('arxiv:doi', ns)
@@ -141,75 +355,112 @@ class ArxivScraper:
             # HTMLページのURL
             html_url = f"https://arxiv.org/html/{arxiv_id}"
             
-            response = requests.get(html_url, headers=self.headers)
+            response = self.http.get(html_url, headers=self.headers, timeout=self.html_timeout)
             
             # HTMLページが存在しない場合はabs ページから試す
             if response.status_code == 404:
                 abs_url = f"https://arxiv.org/abs/{arxiv_id}"
-                response = requests.get(abs_url, headers=self.headers)
+                response = self.http.get(abs_url, headers=self.headers, timeout=self.html_timeout)
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
+                images = self.index_figures(response.content, html_url)[:self.MAX_IMAGES]
                 
-                # 様々な画像パターンを検索
-                img_patterns = [
-                    'img[src*="figure"]',
-                    'img[src*="fig"]', 
-                    'img[alt*="Figure"]',
-                    'img[alt*="Fig"]',
-                    'img[src*="png"]',
-                    'img[src*="jpg"]',
-                    'img[src*="jpeg"]',
-                    'img[src*="svg"]'
-                ]
-                
-                for pattern in img_patterns:
-                    img_tags = soup.select(pattern)
-                    for img in img_tags:
-                        src = img.get('src')
-                        alt = img.get('alt', '')
-                        
-                        if src:
-                            # 相対URLを絶対URLに変換
-                            if src.startswith('//'):
-                                src = 'https:' + src
-                            elif src.startswith('/'):
-                                src = urljoin(html_url, src)
-                            elif not src.startswith('http'):
-                                src = urljoin(html_url, src)
-                            
-                            image_info = {
-                                'url': src,
-                                'alt': alt,
-                                'caption': self.find_caption_near_image(img)
-                            }
-                            
-                            # 重複チェック
-                            if not any(existing['url'] == src for existing in images):
-                                images.append(image_info)
-                
-                # arXivの画像サーバーからも検索
-                arxiv_images = self.get_arxiv_source_images(arxiv_id)
-                images.extend(arxiv_images)
+                # arXivの画像サーバーからも検索（HTMLだけで上限に達していれば不要）
+                if len(images) < self.MAX_IMAGES:
+                    arxiv_images = self.get_arxiv_source_images(arxiv_id)
+                    images.extend(arxiv_images)
                 
         except Exception as e:
             print(f"画像抽出エラー ({arxiv_url}): {e}")
             
-        return images[:5]  # 最大5個まで
+        return images[:self.MAX_IMAGES]  # 最大5個まで
+    
+    @staticmethod
+    def image_priority(img):
+        """画像パターンの優先順位（該当しなければNone）"""
+        src = img.get('src') or ''
+        alt = img.get('alt') or ''
+        
+        # 以前のCSSセレクタと同じ順序・同じ判定（大文字小文字を区別する部分一致）
+        checks = [
+            'figure' in src,
+            'fig' in src,
+            'Figure' in alt,
+            'Fig' in alt,
+            'png' in src,
+            'jpg' in src,
+            'jpeg' in src,
+            'svg' in src,
+        ]
+        for priority, matched in enumerate(checks):
+            if matched:
+                return priority
+        return None
+    
+    def index_figures(self, html, html_url):
+        """HTMLを1回だけ走査して図表とキャプションを抽出（優先パターン順、URL重複なし）"""
+        soup = BeautifulSoup(html, HTML_PARSER)
+        
+        candidates = []  # (優先順位, 文書内の順序, img)
+        next_paragraph = {}  # img → 画像の後の最初の p タグ
+        waiting = []  # 次の p タグを待っている画像
+        
+        # 文書順に1回だけ走査
+        for element in soup.descendants:
+            if not isinstance(element, Tag):
+                continue
+            if element.name == 'img':
+                priority = self.image_priority(element)
+                if priority is not None and element.get('src'):
+                    candidates.append((priority, len(candidates), element))
+                    waiting.append(element)
+            elif element.name == 'p' and waiting:
+                for img in waiting:
+                    next_paragraph[id(img)] = element
+                waiting = []
+        
+        candidates.sort(key=lambda candidate: candidate[:2])
+        
+        images = []
+        seen_urls = set()
+        parent_captions = {}  # 親要素ごとの figcaption（同じ figure 内の画像で再利用）
+        
+        for _, _, img in candidates:
+            src = img.get('src')
+            
+            # 相対URLを絶対URLに変換
+            if src.startswith('//'):
+                src = 'https:' + src
+            elif not src.startswith('http'):
+                src = urljoin(html_url, src)
+            
+            # 重複チェック
+            if src in seen_urls:
+                continue
+            seen_urls.add(src)
+            
+            images.append({
+                'url': src,
+                'alt': img.get('alt', ''),
+                'caption': self.find_caption_near_image(img, parent_captions, next_paragraph.get(id(img)))
+            })
+        
+        return images
     
-    def find_caption_near_image(self, img_tag):
+    def find_caption_near_image(self, img_tag, parent_captions, next_p):
         """画像の近くからキャプションを探す"""
         try:
             # 親要素からキャプションを探す
             parent = img_tag.parent
             if parent:
                 # figcaption タグ
-                caption = parent.find('figcaption')
-                if caption:
-                    return caption.get_text().strip()
+                if id(parent) not in parent_captions:
+                    caption = parent.find('figcaption')
+                    parent_captions[id(parent)] = caption.get_text().strip() if caption else None
+                if parent_captions[id(parent)]:
+                    return parent_captions[id(parent)]
                 
                 # 画像の後の p タグ
-                next_p = img_tag.find_next('p')
                 if next_p and len(next_p.get_text()) < 200:
                     text = next_p.get_text().strip()
                     if any(keyword in text.lower() for keyword in ['figure', 'fig.', 'caption']):
@@ -226,61 +477,95 @@ class ArxivScraper:
         
         try:
             # arXivの画像用URLパターン
-            base_patterns = [
-                f"https://arxiv.org/html/{arxiv_id}/",
-                f"https://arxiv.org/src/{arxiv_id}/",
-            ]
-            
-            # よくある画像ファイル名
-            common_names = [
-                "figure1.png", "figure2.png", "figure3.png",
-                "fig1.png", "fig2.png", "fig3.png",
-                "image1.png", "image2.png", "image3.png",
-                "plot1.png", "plot2.png", "plot3.png"
-            ]
+            base_patterns = {
+                'html': f"https://arxiv.org/html/{arxiv_id}/",
+                'src': f"https://arxiv.org/src/{arxiv_id}/",
+            }
             
-            for base_url in base_patterns:
-                for name in common_names:
-                    img_url = base_url + name
-                    
-                    # 画像が存在するかチェック
-                    try:
-                        response = requests.head(img_url, headers=self.headers, timeout=5)
-                        if response.status_code == 200:
-                            images.append({
-                                'url': img_url,
-                                'alt': f'Figure from {arxiv_id}',
-                                'caption': f'Image: {name}'
-                            })
-                    except:
-                        continue
+            for pattern_name, base_url in base_patterns.items():
+                name = self.find_first_source_image(arxiv_id, pattern_name, base_url)
+                if name:
+                    images.append({
+                        'url': base_url + name,
+                        'alt': f'Figure from {arxiv_id}',
+                        'caption': f'Image: {name}'
+                    })
                         
         except Exception as e:
             print(f"arXivソース画像取得エラー: {e}")
             
         return images
     
-    def download_pdf(self, paper, download_dir="./downloads"):
-        """PDFをダウンロード"""
+    def find_first_source_image(self, arxiv_id, pattern_name, base_url):
+        """よくある画像ファイル名を並列に確認し、COMMON_IMAGE_NAMESの順で最初に存在するファイル名を返す"""
+        # キャッシュ済みの結果を順に確認し、最初に存在する名前より前の未確認の名前だけを確認する
+        unknown_names = []
+        cached_hit = None
+        for name in self.COMMON_IMAGE_NAMES:
+            cached = self.probe_cache.get(arxiv_id, f"{pattern_name}/{name}")
+            if cached:
+                cached_hit = name
+                break
+            if cached is None:
+                unknown_names.append(name)
+        
+        if not unknown_names:
+            return cached_hit
+        
+        executor = ThreadPoolExecutor(max_workers=self.probe_workers)
         try:
-            if not os.path.exists(download_dir):
-                os.makedirs(download_dir)
-                
-            filename = f"{paper['arxiv_id']}.pdf"
-            filepath = os.path.join(download_dir, filename)
-            
-            response = requests.get(paper['pdf_url'], headers=self.headers)
-            response.raise_for_status()
-            
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
-                
-            print(f"PDF downloaded: {filepath}")
-            return filepath
-            
-        except Exception as e:
-            print(f"PDF download error: {e}")
+            futures = {
+                executor.submit(self.probe_image, base_url + name): index
+                for index, name in enumerate(unknown_names)
+            }
+            pending = set(futures.values())
+            best = None
+            for future in as_completed(futures):
+                index = futures[future]
+                pending.discard(index)
+                exists = future.result()
+                if exists is None:
+                    # 通信エラーや一時的なエラー応答は次回再確認する（今回は存在しないものとして扱う）
+                    continue
+                self.probe_cache.set(arxiv_id, f"{pattern_name}/{unknown_names[index]}", exists)
+                if exists and (best is None or index < best):
+                    best = index
+                # より前の名前の確認がすべて終われば、後の名前は待たない
+                if best is not None and not any(i < best for i in pending):
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return unknown_names[best] if best is not None else cached_hit
+    
+    def probe_image(self, img_url):
+        """画像が存在するかチェック（通信エラーや一時的なエラー応答の時はNone）"""
+        try:
+            with self._probe_slots:
+                response = self.http.head(img_url, headers=self.headers, timeout=5)
+        except Exception:
             return None
+        if response.status_code == 200:
+            return True
+        if response.status_code in (404, 410):
+            return False
+        # 429や5xxなどはキャッシュせず次回再確認する
+        return None
+    
+    def save_caches(self):
+        """画像URLの確認結果を保存（実行の最後に1回呼ぶ）"""
+        self.probe_cache.save()
+    
+    def get_pdf_downloader(self, download_dir="./downloads"):
+        """保存先ごとに1つのPdfDownloaderを返す"""
+        with self._pdf_downloaders_lock:
+            if download_dir not in self._pdf_downloaders:
+                self._pdf_downloaders[download_dir] = PdfDownloader(download_dir, http_client=self.http, headers=self.headers)
+            return self._pdf_downloaders[download_dir]
+    
+    def download_pdf(self, paper, download_dir="./downloads"):
+        """PDFをダウンロード（ストリーミング保存・途中再開・内容ハッシュで重複排除）"""
+        return self.get_pdf_downloader(download_dir).download(paper)
 
 def main(custom_queries=None):
     scraper = ArxivScraper()
@@ -327,6 +612,8 @@ def main(custom_queries=None):
                         print(f"     Caption: {img['caption']}")
             
             print("-" * 60)
+    
+    scraper.save_caches()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,66 +1,117 @@
 import os
 import deepl
 from dotenv import load_dotenv
+from translation_cache import TranslationCache, split_sentences
+from quota_ledger import QuotaLedger
 
 load_dotenv()
 
 class DeepLTranslator:
-    def __init__(self):
+    # 1リクエストあたりの上限（テキスト数・リクエスト本文のサイズ128KiBに余裕を持たせた値）
+    MAX_TEXTS_PER_REQUEST = 50
+    MAX_REQUEST_BYTES = 120 * 1024
+    
+    # 文と文の間に空白を入れない翻訳先言語（日本語・中国語）
+    NO_SPACE_LANGUAGES = ('JA', 'ZH')
+    
+    def __init__(self, target_lang="JA", cache=None):
         self.deepl_api_key = os.getenv('DEEPL_API_KEY')
         if not self.deepl_api_key:
             raise ValueError("DEEPL_API_KEY is not set in environment variables")
         self.translator = deepl.Translator(self.deepl_api_key)
+        self.target_lang = target_lang
+        # 文ごとの翻訳をつなぐ文字
+        self.sentence_joiner = "" if target_lang.upper().split('-')[0] in self.NO_SPACE_LANGUAGES else " "
+        
+        # 翻訳結果のキャッシュ（キャッシュ済みの文は文字数を消費しない）
+        self.cache = cache if cache is not None else TranslationCache()
+        
+        # 文字数クォータの台帳（使用状況の取得は実行中1回、以降は翻訳した文字数を差し引く）
+        self.quota = QuotaLedger(self.fetch_usage)
+    
+    def fetch_usage(self):
+        """DeepL APIから使用状況を取得（(使用済み文字数, 上限)）"""
+        usage = self.translator.get_usage()
+        return usage.character.count, usage.character.limit
     
     def get_usage(self):
-        """DeepL使用状況を取得"""
-        try:
-            usage = self.translator.get_usage()
-            return {
-                'used': usage.character.count,
-                'limit': usage.character.limit,
-                'remaining': usage.character.limit - usage.character.count
-            }
-        except Exception as e:
-            print(f"⚠️ Could not check DeepL usage: {e}")
-            return {'used': 0, 'limit': 500000, 'remaining': 500000}
+        """DeepL使用状況を取得（ローカルの台帳から返すためAPIは呼ばない）"""
+        return self.quota.usage()
     
     def translate_abstract(self, abstract):
         """AbstractをDeepLで日本語翻訳"""
+        if not abstract or len(abstract.strip()) < 10:
+            return None
+        return self.translate_batch([abstract])[0]
+    
+    def translation_cost(self, texts):
+        """翻訳に必要な文字数（キャッシュ済みの文は0文字として数える）"""
+        sentences = list(dict.fromkeys(sentence for text in texts for sentence in split_sentences(text)))
+        cached = self.cache.get_many(sentences, self.target_lang)
+        return sum(len(sentence) for sentence in sentences if sentence not in cached)
+    
+    def pack_requests(self, texts):
+        """テキストをDeepLの1リクエストあたりの上限（件数・サイズ）に収まるようにまとめる"""
+        batch = []
+        batch_bytes = 0
+        for text in texts:
+            size = len(text.encode('utf-8'))
+            if batch and (len(batch) >= self.MAX_TEXTS_PER_REQUEST or batch_bytes + size > self.MAX_REQUEST_BYTES):
+                yield batch
+                batch = []
+                batch_bytes = 0
+            batch.append(text)
+            batch_bytes += size
+        if batch:
+            yield batch
+    
+    def translate_batch(self, texts):
+        """複数のテキスト（複数の論文のタイトル・要約など）をまとめて翻訳
+        
+        文単位でキャッシュを確認し、未翻訳の文だけを重複を除いて
+        できるだけ少ないリクエストにまとめてDeepLに送る
+        （改訂版の論文でも変更のない文は文字数を消費しない）。
+        戻り値はtextsと同じ順序の翻訳のリスト（空のテキストや失敗した場合はNone）。
+        """
+        results = [None] * len(texts)
         try:
-            if not abstract or len(abstract.strip()) < 10:
-                return None
+            # テキスト全体がキャッシュ済みならそのまま使う
+            targets = [i for i, text in enumerate(texts) if text and text.strip()]
+            cached = self.cache.get_many([texts[i] for i in targets], self.target_lang)
+            for i in targets:
+                results[i] = cached.get(texts[i])
+            targets = [i for i in targets if results[i] is None]
+            if not targets:
+                return results
             
-            # 長すぎる場合は分割（DeepLの制限対策）
-            max_length = 4000
-            if len(abstract) > max_length:
-                # 文の区切りで分割
-                sentences = abstract.split('. ')
-                chunks = []
-                current_chunk = ""
-                
-                for sentence in sentences:
-                    test_chunk = current_chunk + sentence + ". "
-                    if len(test_chunk) < max_length:
-                        current_chunk = test_chunk
-                    else:
-                        if current_chunk:
-                            chunks.append(current_chunk.strip())
-                        current_chunk = sentence + ". "
-                
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                
-                # 各チャンクを翻訳
-                translated_chunks = []
-                for chunk in chunks:
-                    result = self.translator.translate_text(chunk, target_lang="JA")
-                    translated_chunks.append(result.text)
-                
-                return " ".join(translated_chunks)
+            sentences = {i: split_sentences(texts[i]) for i in targets}
+            all_sentences = [sentence for i in targets for sentence in sentences[i]]
+            translations = self.cache.get_many(all_sentences, self.target_lang)
+            missing = list(dict.fromkeys(sentence for sentence in all_sentences if sentence not in translations))
+            
+            if missing:
+                requests = list(self.pack_requests(missing))
+                print(f"🔄 Translating {len(missing)}/{len(all_sentences)} sentences "
+                      f"({sum(len(sentence) for sentence in missing)} chars) in {len(requests)} request(s)")
+                for chunk in requests:
+                    try:
+                        response = self.translator.translate_text(chunk, target_lang=self.target_lang)
+                    except Exception:
+                        # クォータ超過などの可能性があるため、使用状況をAPIと突き合わせる
+                        self.quota.reconcile()
+                        raise
+                    self.quota.consume(sum(len(text) for text in chunk))
+                    new_translations = dict(zip(chunk, (result.text for result in response)))
+                    self.cache.put_many(new_translations, self.target_lang)
+                    translations.update(new_translations)
             else:
-                result = self.translator.translate_text(abstract, target_lang="JA")
-                return result.text
+                print(f"💾 All {len(all_sentences)} sentences found in translation cache")
+            
+            for i in targets:
+                results[i] = self.sentence_joiner.join(translations[sentence] for sentence in sentences[i])
+            self.cache.put_many({texts[i]: results[i] for i in targets}, self.target_lang)
+            return results
                 
         except Exception as e:
             print(f"❌ Translation error: {e}")
-            return None
\ No newline at end of file
+            return results
@@ -0,0 +1,241 @@
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from http_client import get_shared_client
+
+class FigureCache:
+    """図表画像のローカルキャッシュ
+
+    画像は内容のSHA-256で保存するため、別URLの同じ画像は1つだけ保存される。
+    保存時にサムネイルを作り、サイズと縦横のピクセル数を記録する。
+    URLごとの確認結果も記録するので、2回目以降の実行ではダウンロードも検証も行わない。
+    合計サイズが上限を超えたら、最終利用が古い画像から削除する。
+    """
+
+    # Content-Typeごとの拡張子
+    EXTENSIONS = {
+        'image/png': '.png',
+        'image/jpeg': '.jpg',
+        'image/gif': '.gif',
+        'image/webp': '.webp',
+        'image/svg+xml': '.svg',
+    }
+
+    def __init__(self, cache_dir="./cache/figures", max_bytes=500 * 1024 * 1024, thumbnail_size=(320, 320),
+                 workers=4, max_image_bytes=20 * 1024 * 1024, http_client=None, headers=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        self.workers = workers
+        self.max_image_bytes = max_image_bytes
+        self.headers = headers or {}
+        self.http = http_client if http_client is not None else get_shared_client()
+
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        # URL → 画像（digestがNULLなら画像として無効だったURL）
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            " url TEXT PRIMARY KEY,"
+            " digest TEXT,"
+            " checked_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            " digest TEXT PRIMARY KEY,"
+            " path TEXT NOT NULL,"
+            " thumbnail_path TEXT,"
+            " content_type TEXT NOT NULL,"
+            " bytes INTEGER NOT NULL,"
+            " width INTEGER,"
+            " height INTEGER,"
+            " last_access REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def _lookup_url(self, url):
+        """URLの確認結果を取得（未確認ならNone、無効な画像なら空の辞書）"""
+        with self._lock:
+            row = self.conn.execute("SELECT digest FROM urls WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            if row[0] is None:
+                return {}
+            asset = self._get_asset(row[0])
+            if asset is None or not os.path.exists(asset['local_path']):
+                # 削除済みの画像は再取得する
+                return None
+            self.conn.execute("UPDATE images SET last_access = ? WHERE digest = ?", (time.time(), row[0]))
+            self.conn.commit()
+            return asset
+
+    def _get_asset(self, digest):
+        row = self.conn.execute(
+            "SELECT path, thumbnail_path, content_type, bytes, width, height FROM images WHERE digest = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            return None
+        path, thumbnail_path, content_type, size, width, height = row
+        return {
+            'sha256': digest,
+            'local_path': path,
+            'thumbnail_path': thumbnail_path,
+            'content_type': content_type,
+            'bytes': size,
+            'width': width,
+            'height': height,
+        }
+
+    def fetch(self, url):
+        """画像を1件取得してキャッシュに保存（無効な画像ならNone）"""
+        cached = self._lookup_url(url)
+        if cached is not None:
+            return cached or None
+
+        asset = None
+        try:
+            asset = self._download(url)
+        except Exception as e:
+            # 通信エラー・一時的なエラー応答は記録せず次回再確認する
+            print(f"⚠️ Figure download error ({url}): {e}")
+            return None
+
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO urls (url, digest, checked_at) VALUES (?, ?, ?)",
+                (url, asset['sha256'] if asset else None, time.time())
+            )
+            self.conn.commit()
+        return asset
+
+    def _download(self, url):
+        """画像をダウンロードして検証・保存・サムネイル作成"""
+        with self.http.get(url, headers=self.headers, stream=True) as response:
+            if response.status_code in (404, 410):
+                return None
+            if response.status_code != 200:
+                # 429や5xxなどの一時的なエラーは無効なURLとして記録しない
+                raise IOError(f"HTTP {response.status_code}")
+
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            extension = self.EXTENSIONS.get(content_type)
+            if not extension:
+                return None
+
+            # 大きすぎる画像は本文を読まずに除外
+            content_length = response.headers.get('Content-Length')
+            if content_length and content_length.isdigit() and int(content_length) > self.max_image_bytes:
+                return None
+
+            # Content-Lengthがない・偽っている場合に備え、読み込む量もmax_image_bytesまでに制限する
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size > self.max_image_bytes:
+                    return None
+                chunks.append(chunk)
+            content = b''.join(chunks)
+        if not content:
+            return None
+
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            existing = self._get_asset(digest)
+        if existing and os.path.exists(existing['local_path']):
+            # 別URLで同じ画像を保存済み
+            return existing
+
+        width = height = None
+        thumbnail_path = None
+        if content_type != 'image/svg+xml':
+            try:
+                with Image.open(io.BytesIO(content)) as image:
+                    image.load()
+                    width, height = image.size
+                    thumbnail = image.convert('RGB') if image.mode not in ('RGB', 'L') else image.copy()
+                    thumbnail.thumbnail(self.thumbnail_size)
+                    thumbnail_path = self._path_for(digest, '.thumb.jpg')
+                    thumbnail.save(thumbnail_path, 'JPEG', quality=85)
+            except Exception:
+                # 画像として開けないものは無効
+                return None
+
+        path = self._path_for(digest, extension)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO images (digest, path, thumbnail_path, content_type, bytes, width, height, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (digest, path, thumbnail_path, content_type, len(content), width, height, time.time())
+            )
+            self._evict()
+            self.conn.commit()
+            return self._get_asset(digest)
+
+    def _path_for(self, digest, suffix):
+        directory = os.path.join(self.cache_dir, digest[:2])
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, digest + suffix)
+
+    def _evict(self):
+        """合計サイズが上限を超えたら、最終利用が古い画像から削除（ロック取得済みで呼ぶ）"""
+        total = self.conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM images").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute("SELECT digest, path, thumbnail_path, bytes FROM images ORDER BY last_access").fetchall()
+        for digest, path, thumbnail_path, size in rows:
+            if total <= target:
+                break
+            for file_path in (path, thumbnail_path):
+                if file_path and os.path.exists(file_path):
+                    os.remove(file_path)
+            self.conn.execute("DELETE FROM images WHERE digest = ?", (digest,))
+            self.conn.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+            total -= size
+
+    def cache_images(self, papers):
+        """各論文の図表を並列に取得し、paper['images']を検証済み・重複なしの画像に置き換える"""
+        urls = []
+        for paper in papers:
+            for img in paper.get('images') or []:
+                if img['url'] not in urls:
+                    urls.append(img['url'])
+        if not urls:
+            return papers
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            assets = dict(zip(urls, executor.map(self.fetch, urls)))
+
+        for paper in papers:
+            if not paper.get('images'):
+                continue
+            images = []
+            seen_digests = set()
+            for img in paper['images']:
+                asset = assets.get(img['url'])
+                # 無効な画像と、同じ論文内の重複画像を除外
+                if not asset or asset['sha256'] in seen_digests:
+                    continue
+                seen_digests.add(asset['sha256'])
+                images.append({**img, **asset})
+            paper['images'] = images
+
+        print(f"🖼️ Figure cache: {sum(1 for asset in assets.values() if asset)}/{len(urls)} images available locally")
+        return papers
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,113 @@
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pypdf import PdfReader
+
+def extract_pdf_text(pdf_path):
+    """PDFから全文テキストを抽出（プロセスプールで実行するためモジュール関数にしている）"""
+    reader = PdfReader(pdf_path)
+    pages = []
+    for page in reader.pages:
+        try:
+            pages.append(page.extract_text() or '')
+        except Exception:
+            # 壊れたページは飛ばして残りを使う
+            continue
+    return '\n'.join(pages)
+
+class FullTextIndex:
+    """ダウンロード済みPDFの全文検索インデックス（SQLite FTS5、arXiv ID単位）"""
+
+    def __init__(self, db_path="./cache/fulltext.sqlite", workers=None):
+        self.db_path = db_path
+        self.workers = workers or os.cpu_count() or 1
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS fulltext USING fts5("
+            " arxiv_id UNINDEXED, title, body, tokenize='porter unicode61')"
+        )
+        # どのPDFから抽出したか（PDFのパスは内容ハッシュなので、同じなら再抽出不要）
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " arxiv_id TEXT PRIMARY KEY,"
+            " pdf_path TEXT NOT NULL,"
+            " chars INTEGER NOT NULL)"
+        )
+        self.conn.commit()
+
+    def is_indexed(self, arxiv_id, pdf_path=None):
+        """インデックス済みか（pdf_pathを渡した場合は同じPDFから抽出済みか）"""
+        row = self.conn.execute("SELECT pdf_path FROM documents WHERE arxiv_id = ?", (arxiv_id,)).fetchone()
+        if row is None:
+            return False
+        return pdf_path is None or os.path.basename(row[0]) == os.path.basename(pdf_path)
+
+    def add(self, arxiv_id, pdf_path, text, title=''):
+        """抽出したテキストをインデックスに追加（既存の内容は置き換え）"""
+        self.conn.execute("DELETE FROM fulltext WHERE arxiv_id = ?", (arxiv_id,))
+        self.conn.execute("INSERT INTO fulltext (arxiv_id, title, body) VALUES (?, ?, ?)", (arxiv_id, title, text))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO documents (arxiv_id, pdf_path, chars) VALUES (?, ?, ?)",
+            (arxiv_id, pdf_path, len(text))
+        )
+        self.conn.commit()
+
+    def index_pdfs(self, papers, pdf_paths):
+        """PDFのテキスト抽出をプロセスプールで並列実行してインデックスに追加
+
+        pdf_pathsは {arxiv_id: PDFのパス}（PdfDownloader.download_allの戻り値）。
+        """
+        titles = {paper.get('arxiv_id'): paper.get('title', '') for paper in papers}
+        pending = {
+            arxiv_id: path for arxiv_id, path in pdf_paths.items()
+            if path and not self.is_indexed(arxiv_id, path)
+        }
+        if not pending:
+            return 0
+
+        indexed = 0
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(pending))) as executor:
+            futures = {executor.submit(extract_pdf_text, path): arxiv_id for arxiv_id, path in pending.items()}
+
+            # 抽出が終わったものから書き込む（SQLiteへの書き込みはこのプロセスのみ）
+            for future in as_completed(futures):
+                arxiv_id = futures[future]
+                try:
+                    text = future.result()
+                except Exception as e:
+                    print(f"❌ PDF text extraction error ({arxiv_id}): {e}")
+                    continue
+                self.add(arxiv_id, pending[arxiv_id], text, titles.get(arxiv_id, ''))
+                indexed += 1
+
+        print(f"📚 Indexed full text of {indexed} PDFs")
+        return indexed
+
+    def get_text(self, arxiv_id):
+        """インデックス済みの全文を取得"""
+        row = self.conn.execute("SELECT body FROM fulltext WHERE arxiv_id = ?", (arxiv_id,)).fetchone()
+        return row[0] if row else None
+
+    def search(self, query, limit=20):
+        """全文検索（FTS5のクエリ構文）。(arxiv_id, 抜粋) のリストを関連度順に返す"""
+        return self.conn.execute(
+            "SELECT arxiv_id, snippet(fulltext, 2, '[', ']', '…', 16) FROM fulltext"
+            " WHERE fulltext MATCH ? ORDER BY rank LIMIT ?",
+            (query, limit)
+        ).fetchall()
+
+    def matches(self, arxiv_id, phrase):
+        """論文の全文にフレーズが含まれるか（関連性チェック用）"""
+        row = self.conn.execute(
+            "SELECT 1 FROM fulltext WHERE fulltext MATCH ? AND arxiv_id = ?",
+            ('"' + phrase.replace('"', '""') + '"', arxiv_id)
+        ).fetchone()
+        return row is not None
+
+    def close(self):
+        self.conn.close()
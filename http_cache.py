@@ -0,0 +1,206 @@
+import io
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+class ResponseCache:
+    """GETレスポンスのディスクキャッシュ（SQLite）
+
+    本文はzlib圧縮して保存し、URLの種類ごとのTTL内ならそのまま返す。
+    TTL切れの場合はETag/Last-Modifiedで条件付きGETを行い、304なら保存済みの本文を使う。
+    合計サイズが上限を超えたら最終アクセスが古い順に削除する（LRU）。
+    """
+
+    # URLの種類ごとのTTL（秒）。どれにも当てはまらないURLはキャッシュしない
+    DEFAULT_TTLS = [
+        (r'^https?://export\.arxiv\.org/api/', 6 * 3600),     # 検索結果は日次で変わる
+        (r'^https?://arxiv\.org/html/[^/?]+/?(\?|$)', 30 * 24 * 3600),  # 論文HTMLはほぼ不変（図表画像は除く）
+        (r'^https?://arxiv\.org/abs/', 7 * 24 * 3600),       # absページ
+    ]
+
+    # キャッシュするステータスコード（HTMLページの404も記録してabsへのフォールバックを速くする）
+    CACHEABLE_STATUSES = (200, 404)
+
+    # 404のTTL（秒）。HTML版は投稿の数時間後に生成されることがあるので、URLの種類のTTLより短くする
+    NOT_FOUND_TTL = 6 * 3600
+
+    # 保存するレスポンスヘッダー
+    STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+    def __init__(self, db_path="./cache/http_cache.sqlite", ttls=None, max_bytes=200 * 1024 * 1024):
+        self.db_path = db_path
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in (ttls if ttls is not None else self.DEFAULT_TTLS)]
+        self.max_bytes = max_bytes
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY,"
+            " status INTEGER NOT NULL,"
+            " headers TEXT NOT NULL,"
+            " body BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self.conn.commit()
+
+    @staticmethod
+    def build_key(url, params=None):
+        """クエリパラメータを含めた完全なURLをキーにする"""
+        return requests.Request('GET', url, params=params).prepare().url
+
+    def ttl_for(self, url):
+        """URLに対応するTTL（キャッシュ対象外ならNone）"""
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return None
+
+    def lookup(self, url):
+        """キャッシュを検索し (レスポンス, 新鮮かどうか) を返す（なければ (None, False)）"""
+        ttl = self.ttl_for(url)
+        if ttl is None:
+            return None, False
+
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT status, headers, body, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None, False
+            self.conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+            self.conn.commit()
+
+        status, headers, body, fetched_at = row
+        if status == 404:
+            ttl = min(ttl, self.NOT_FOUND_TTL)
+        response = self._build_response(url, status, json.loads(headers), zlib.decompress(body))
+        return response, time.time() - fetched_at < ttl
+
+    def conditional_headers(self, cached_response):
+        """再検証用の条件付きGETヘッダー"""
+        headers = {}
+        if cached_response.headers.get('ETag'):
+            headers['If-None-Match'] = cached_response.headers['ETag']
+        if cached_response.headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = cached_response.headers['Last-Modified']
+        return headers
+
+    def touch(self, url):
+        """304で再検証できた場合に取得時刻を更新"""
+        with self._lock:
+            now = time.time()
+            self.conn.execute("UPDATE responses SET fetched_at = ?, last_access = ? WHERE url = ?", (now, now, url))
+            self.conn.commit()
+
+    def store(self, url, response):
+        """レスポンスを保存し、キャッシュから返すのと同じ形のレスポンスを返す"""
+        if self.ttl_for(url) is None or response.status_code not in self.CACHEABLE_STATUSES:
+            return response
+
+        content = response.content
+        headers = self._stored_headers(response)
+        self._insert(url, response.status_code, headers, content)
+        return self._build_response(url, response.status_code, headers, content)
+
+    def store_stream(self, url, response):
+        """stream=Trueのレスポンスを、読み出しながら保存するようにして返す
+
+        本文はresponse.rawから読まれた分だけを記録し、最後まで読まれた時点で保存する。
+        途中で読むのをやめた場合は保存しない。
+        """
+        if self.ttl_for(url) is None or response.status_code not in self.CACHEABLE_STATUSES:
+            return response
+
+        headers = self._stored_headers(response)
+        response.raw = _TeeReader(
+            response.raw, lambda content: self._insert(url, response.status_code, headers, content)
+        )
+        return response
+
+    def _stored_headers(self, response):
+        return {name: response.headers[name] for name in self.STORED_HEADERS if name in response.headers}
+
+    def _insert(self, url, status, headers, content):
+        body = zlib.compress(content)
+        with self._lock:
+            now = time.time()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (url, status, headers, body, size, fetched_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, status, json.dumps(headers), body, len(body), now, now)
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """合計サイズが上限を超えたら、最終アクセスが古いものから削除（ロック取得済みで呼ぶ）"""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # 上限の9割まで減らして、毎回の削除を避ける
+        target = self.max_bytes * 0.9
+        for url, size in self.conn.execute("SELECT url, size FROM responses ORDER BY last_access").fetchall():
+            if total <= target:
+                break
+            self.conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+
+    @staticmethod
+    def _build_response(url, status, headers, content):
+        """保存済みデータからrequests.Responseを組み立てる（stream=Trueでの読み出しにも対応）"""
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response.url = url
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = content
+        response.raw = io.BytesIO(content)
+        return response
+
+class _TeeReader:
+    """response.rawを包み、読み出した本文を記録して、最後まで読まれたらon_completeに渡す"""
+
+    def __init__(self, raw, on_complete):
+        self._raw = raw
+        self._on_complete = on_complete
+        self._chunks = []
+        self._done = False
+
+    def read(self, amt=None, *args, **kwargs):
+        # キャッシュには展開済みの本文を保存する（storeでのresponse.contentと同じ）
+        kwargs['decode_content'] = True
+        data = self._raw.read(amt, *args, **kwargs)
+        if data:
+            self._chunks.append(data)
+        elif not self._done:
+            self._done = True
+            self._on_complete(b''.join(self._chunks))
+            self._chunks = []
+        return data
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        # requestsのiter_contentはraw.streamを使うため、元のstreamに任せず自身のreadで読む
+        while True:
+            data = self.read(amt)
+            if not data:
+                break
+            yield data
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
@@ -0,0 +1,136 @@
+import random
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from http_cache import ResponseCache
+
+class HttpClient:
+    """スクレイパー共通のHTTPクライアント
+
+    コネクションを再利用するセッションに、デフォルトのタイムアウト、
+    ホストごとのリクエスト間隔制限、ジッター付きリトライをまとめたもの。
+    cacheを渡すとGETレスポンスをディスクにキャッシュする。
+    """
+
+    # ホストごとの最小リクエスト間隔（秒）
+    # arXiv APIは「3秒に1リクエスト」、arxiv.org本体は1秒に4リクエストまで
+    DEFAULT_HOST_INTERVALS = {
+        'export.arxiv.org': 3.0,
+        'oaipmh.arxiv.org': 3.0,
+        'arxiv.org': 0.25,
+    }
+
+    # リトライ対象のステータスコード
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, host_intervals=None, timeout=(10, 30), max_retries=3, backoff_base=1.0,
+                 max_backoff=60.0, pool_size=16, cache=None):
+        self.host_intervals = dict(self.DEFAULT_HOST_INTERVALS if host_intervals is None else host_intervals)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.cache = cache
+
+        # Keep-Aliveでコネクションを使い回す
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # ホストごとの次回リクエスト可能時刻
+        self._host_locks = {}
+        self._next_request_time = {}
+        self._locks_lock = threading.Lock()
+
+    def _wait_for_host(self, url):
+        """ホストごとのリクエスト間隔を守る（全スレッド共通）"""
+        host = urlparse(url).hostname or ''
+        interval = self.host_intervals.get(host)
+        if not interval:
+            return
+
+        with self._locks_lock:
+            lock = self._host_locks.setdefault(host, threading.Lock())
+
+        with lock:
+            wait_time = self._next_request_time.get(host, 0.0) - time.monotonic()
+            if wait_time > 0:
+                time.sleep(wait_time)
+            self._next_request_time[host] = time.monotonic() + interval
+
+    def _backoff(self, attempt, response=None):
+        """リトライまでの待機時間（Retry-Afterがあれば優先、なければジッター付き指数バックオフ）"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(int(retry_after), self.max_backoff)
+        delay = self.backoff_base * (2 ** attempt)
+        return min(delay * random.uniform(0.5, 1.5), self.max_backoff)
+
+    def request(self, method, url, **kwargs):
+        """リクエストを送信（レート制限・タイムアウト・リトライ付き）"""
+        kwargs.setdefault('timeout', self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_host(url)
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code in self.RETRY_STATUSES and attempt < self.max_retries:
+                delay = self._backoff(attempt, response)
+                response.close()
+                print(f"⏳ HTTP {response.status_code} from {urlparse(url).hostname}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            return response
+
+    def get(self, url, **kwargs):
+        """GETリクエスト（キャッシュがあれば利用し、期限切れなら条件付きGETで再検証）"""
+        if self.cache is None:
+            return self.request('GET', url, **kwargs)
+
+        key = self.cache.build_key(url, kwargs.get('params'))
+        cached, fresh = self.cache.lookup(key)
+        if fresh:
+            return cached
+
+        if cached is not None:
+            headers = dict(kwargs.get('headers') or {})
+            headers.update(self.cache.conditional_headers(cached))
+            kwargs['headers'] = headers
+
+        response = self.request('GET', url, **kwargs)
+
+        # 変更なし：保存済みの本文を使う
+        if cached is not None and response.status_code == 304:
+            response.close()
+            self.cache.touch(key)
+            return cached
+
+        if kwargs.get('stream'):
+            # 本文を一度に読み込まず、呼び出し側が読み進めるのに合わせて保存する
+            return self.cache.store_stream(key, response)
+        return self.cache.store(key, response)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+def get_shared_client():
+    """プロセス全体で共有するHttpClientを取得"""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = HttpClient(cache=ResponseCache())
+        return _shared_client
@@ -0,0 +1,71 @@
+import re
+
+class KeywordMatcher:
+    """キーワード集合を事前に組み立て、テキストを1回の単語分割で照合する
+
+    英数字の単語キーワードは単語単位で一致させ、末尾の複数形（s/es）も許容する
+    （'wind' は 'winds' に一致し、'window' には一致しない）。
+    単語の集合引きで照合するため、キーワード数が増えても1件あたりの時間はほぼ一定。
+    複数語のフレーズは先頭の単語が含まれる場合だけ正規表現で確認する。
+    日本語などのキーワードは単語境界がないため部分一致で照合する。
+    """
+
+    TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+    def __init__(self, keywords):
+        self.keywords = sorted({keyword.lower().strip() for keyword in keywords if keyword.strip()})
+
+        # 単語キーワード（複数形 → 元のキーワード）
+        self.word_forms = {}
+        # フレーズの先頭の単語と、フレーズ全体の正規表現
+        phrases = []
+        self.phrase_heads = set()
+        # 単語分割できないキーワード（日本語など）
+        self.substrings = []
+
+        for keyword in self.keywords:
+            tokens = self.TOKEN_PATTERN.findall(keyword)
+            if ' '.join(tokens) != keyword:
+                self.substrings.append(keyword)
+            elif len(tokens) == 1:
+                for suffix in ('', 's', 'es'):
+                    self.word_forms.setdefault(keyword + suffix, keyword)
+            else:
+                phrases.append(r'\s+'.join(re.escape(token) for token in tokens))
+                self.phrase_heads.add(tokens[0])
+
+        self.phrase_pattern = None
+        if phrases:
+            self.phrase_pattern = re.compile(
+                r'(?<![a-z0-9])(' + '|'.join(sorted(phrases, key=len, reverse=True)) + r')(?:e?s)?(?![a-z0-9])'
+            )
+
+    def matches(self, text):
+        """いずれかのキーワードを含むか"""
+        if not text:
+            return False
+        text = text.lower()
+        tokens = self.TOKEN_PATTERN.findall(text)
+
+        if not self.word_forms.keys().isdisjoint(tokens):
+            return True
+        if self.phrase_pattern and not self.phrase_heads.isdisjoint(tokens) and self.phrase_pattern.search(text):
+            return True
+        return any(keyword in text for keyword in self.substrings)
+
+    def find_all(self, text):
+        """含まれるキーワードの集合（小文字）"""
+        if not text:
+            return set()
+        text = text.lower()
+        tokens = self.TOKEN_PATTERN.findall(text)
+
+        found = {self.word_forms[token] for token in self.word_forms.keys() & set(tokens)}
+        if self.phrase_pattern and not self.phrase_heads.isdisjoint(tokens):
+            found.update(' '.join(match.group(1).split()) for match in self.phrase_pattern.finditer(text))
+        found.update(keyword for keyword in self.substrings if keyword in text)
+        return found
+
+    def filter(self, texts):
+        """複数テキストをまとめて判定（一致したかどうかのリスト）"""
+        return [self.matches(text) for text in texts]
@@ -30,6 +30,8 @@ class LineNotifier:
         """1つ目のメッセージ（基本情報）をフォーマット"""
         message = f"[{paper_num}/{total_papers}] 📄 新しい論文\n\n"
         message += f"【タイトル】\n{paper.get('title', '不明')}\n\n"
+        if paper.get('translated_title'):
+            message += f"【タイトル（日本語訳）】\n{paper['translated_title']}\n\n"
         message += f"【著者】\n{paper.get('authors_str', '不明')}\n\n"
         message += f"【公開日】\n{paper.get('published', '不明')}\n\n"
         
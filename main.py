@@ -1,8 +1,19 @@
 import time
+import numpy as np
 from deepl_translator import DeepLTranslator
 from arxiv_scraper import ArxivScraper
 from line_notifier import LineNotifier
 from notion_saver import NotionSaver
+from notion_writer import NotionWriter
+from notion_outbox import NotionOutbox
+from fulltext_index import FullTextIndex
+from figure_cache import FigureCache
+from keyword_matcher import KeywordMatcher
+from paper_ranker import PaperRanker
+from near_duplicate import NearDuplicateIndex
+from seen_index import SeenPaperIndex, paper_keys
+from translation_planner import TranslationPlanner
+from translation_cache import split_sentences
 
 # ========================================
 # 設定
@@ -16,6 +27,15 @@ SEARCH_KEYWORDS = [
     "typhoon landfall prediction",
 ]
 
+# 関連キーワード（台風・熱帯低気圧関連）
+# 論文のタイトル・要約に検索キーワードの単語かこれらのいずれかを含めば関連ありと判定
+RELEVANCE_KEYWORDS = [
+    'typhoon', 'tropical cyclone', 'hurricane', 'cyclone',
+    'storm', 'weather forecasting', 'meteorology', 'atmospheric',
+    'precipitation', 'wind', 'satellite', 'climate', 'prediction',
+    '台風', '熱帯低気圧', '気象', '予報', '予測'
+]
+
 # 各キーワードで取得する論文数
 PAPERS_PER_KEYWORD = 1
 
@@ -26,6 +46,28 @@ MAX_NEW_PAPERS_PER_DAY = 2
 MESSAGE_INTERVAL = 2
 QUERY_INTERVAL = 5
 
+# 検索モード
+#   "batch":       全キーワードを1回のarXiv APIリクエストでまとめて検索する
+#   "incremental": 前回実行以降に投稿された論文のみをキーワードごとに取得する
+#   "per_keyword": キーワードごとに関連性順で検索する
+SEARCH_MODE = "batch"
+
+# 差分取得で1キーワードあたりに取得する論文数の上限
+# （ウォーターマークに達するまでページングし、この数を超えたらウォーターマークを進めない）
+INCREMENTAL_MAX_RESULTS = 1000
+
+# 処理する論文のPDFをダウンロードして全文検索インデックスに追加する
+ENABLE_FULL_TEXT = False
+
+# 論文の図表をローカルにキャッシュし、検証済みの画像のみNotionに渡す
+ENABLE_FIGURE_CACHE = False
+
+# Notionとの差分同期の間隔（時間）。この間隔内の実行ではNotionにアクセスしない
+# このシステムが保存する論文は送信待ちキューと処理済みインデックスに記録されるので、
+# 同期はNotion上で手動で追加・編集されたページを取り込むためだけに行う。
+# ワークフローは1日1回の実行なので、間隔は実行間隔より十分長い7日にする（1日未満だと毎回同期になる）
+NOTION_SYNC_INTERVAL_HOURS = 7 * 24
+
 class PaperNotificationSystem:
     def __init__(self):
         # 各APIクライアントを初期化
@@ -33,36 +75,86 @@ class PaperNotificationSystem:
         self.arxiv = ArxivScraper()
         self.line = LineNotifier()
         self.notion = NotionSaver()
+        self.notion_writer = NotionWriter(self.notion)
+        # Notionへの書き込み待ちキュー（前回失敗したものも含めて実行の最後に送信）
+        self.notion_outbox = NotionOutbox()
         
-        # 既存のURLを取得（重複チェック用）
-        self.existing_urls = self.notion.get_existing_urls() if self.notion.is_enabled() else set()
+        # 処理済み論文のローカルインデックス（重複チェック用）
+        self.seen = SeenPaperIndex()
+        self.sync_seen_index()
         
         # 処理済み新規論文数をカウント
         self.processed_new_papers = 0
         
+        # この実行でいずれかのキーワードに選んだ論文のキー（キーワード間の重複防止）
+        self.selected_keys = set()
+        
+        # 検索キーワードごとのキーワード照合器（実行中に1回だけ作成）
+        self.matchers = {}
+        
+        # 処理済み論文の近似重複インデックス（バージョン違いや別の情報源の同じ論文を検出）
+        self.near_duplicates = NearDuplicateIndex()
+        
+        # 残り文字数に応じた翻訳の計画（費用はキャッシュにない文の文字数）
+        self.translation_planner = TranslationPlanner(cost_fn=self.deepl.translation_cost)
+        
+        # 候補論文のBM25ランキング（コーパス統計は過去の取得結果から更新）
+        self.ranker = PaperRanker()
+        
+        # PDFの全文インデックス（有効な場合のみ）
+        self.pdf_downloader = self.arxiv.get_pdf_downloader() if ENABLE_FULL_TEXT else None
+        self.fulltext = FullTextIndex() if ENABLE_FULL_TEXT else None
+        
+        # 図表画像のローカルキャッシュ（有効な場合のみ）
+        self.figure_cache = FigureCache(headers=self.arxiv.headers) if ENABLE_FIGURE_CACHE else None
+        
         print("🚀 Paper Notification System initialized")
     
-    def is_relevant_paper(self, paper, query):
-        """論文がクエリに関連しているかチェック"""
-        # 関連キーワード（台風・熱帯低気圧関連）
-        typhoon_keywords = [
-            'typhoon', 'tropical cyclone', 'hurricane', 'cyclone',
-            'storm', 'weather forecasting', 'meteorology', 'atmospheric',
-            'precipitation', 'wind', 'satellite', 'climate', 'prediction',
-            '台風', '熱帯低気圧', '気象', '予報', '予測'
-        ]
+    def sync_seen_index(self):
+        """前回の同期以降にNotionで作成・編集された論文をローカルインデックスに取り込む"""
+        if not self.notion.is_enabled() or not self.seen.sync_due(NOTION_SYNC_INTERVAL_HOURS * 3600):
+            print(f"📊 {len(self.seen)} seen paper keys in local index")
+            return
         
-        # タイトルと要約を結合してチェック
-        text_to_check = (paper.get('title', '') + ' ' + paper.get('abstract', '')).lower()
+        cursor = self.seen.notion_cursor
+        print(f"🔄 Syncing papers from Notion ({'since ' + cursor if cursor else 'full import'})...")
         
-        # クエリのキーワードが含まれているかチェック
-        query_words = query.lower().split()
-        query_match = any(word in text_to_check for word in query_words)
+        # URLプロパティのIDは1回だけ取得して保存
+        url_property_id = self.seen.get_meta('notion_url_property_id')
+        if url_property_id is None:
+            url_property_id = self.notion.get_property_id("URL")
+            if url_property_id:
+                self.seen.set_meta('notion_url_property_id', url_property_id)
         
-        # 台風関連キーワードが含まれているかチェック
-        keyword_match = any(keyword.lower() in text_to_check for keyword in typhoon_keywords)
+        result = self.notion.get_urls_since(cursor, url_property_id)
+        if result is None:
+            # 取得に失敗した場合は次回再試行する
+            return
         
-        return query_match or keyword_match
+        urls, cursor = result
+        self.seen.add_urls(urls, source='notion')
+        self.seen.mark_synced(cursor)
+        print(f"📊 Synced {len(urls)} papers from Notion ({len(self.seen)} seen paper keys in local index)")
+    
+    def get_matcher(self, query):
+        """クエリの単語と関連キーワードをまとめた照合器を取得"""
+        if query not in self.matchers:
+            self.matchers[query] = KeywordMatcher(query.split() + RELEVANCE_KEYWORDS)
+        return self.matchers[query]
+    
+    def is_relevant_paper(self, paper, query):
+        """論文がクエリに関連しているかチェック"""
+        # タイトルと要約を結合し、クエリの単語または関連キーワードを含むかを1回の走査でチェック
+        text_to_check = paper.get('title', '') + ' ' + paper.get('abstract', '')
+        matcher = self.get_matcher(query)
+        if matcher.matches(text_to_check):
+            return True
+        
+        # 要約に含まれなくても、以前に全文をインデックスした論文なら本文でもチェック
+        arxiv_id = paper.get('arxiv_id')
+        if self.fulltext and arxiv_id and self.fulltext.is_indexed(arxiv_id):
+            return any(self.fulltext.matches(arxiv_id, keyword) for keyword in matcher.keywords)
+        return False
     
     def filter_relevant_papers(self, papers, query):
         """関連性の高い論文のみフィルタリング"""
@@ -77,38 +169,79 @@ class PaperNotificationSystem:
             
             # 重複チェック
             paper_url = paper.get('pdf_url') or paper.get('url')
-            if self.notion.is_duplicate(paper_url, self.existing_urls):
+            if self.seen.contains(paper):
                 print(f"🔄 Duplicate (skipping): {paper['title'][:60]}...")
                 print(f"   URL: {paper_url}")
                 continue
             
+            # 近似重複チェック（タイトル・要約がほぼ同じ論文を処理済み）
+            near_duplicate = self.near_duplicates.find(paper)
+            if near_duplicate:
+                key, title, score = near_duplicate
+                print(f"🔄 Near duplicate (skipping): {paper['title'][:60]}...")
+                print(f"   Similar to: {title[:60]} ({key}, similarity {score:.2f})")
+                continue
+            
             # 関連性があり、重複でない論文のみ追加
             relevant_papers.append(paper)
             print(f"✅ New relevant paper: {paper['title'][:60]}...")
         
         return relevant_papers
     
+    def index_full_text(self, papers):
+        """PDFを並列ダウンロードし、全文テキストを抽出してインデックスに追加"""
+        if not self.fulltext:
+            return
+        
+        print(f"📥 Downloading {len(papers)} PDFs for full-text indexing...")
+        pdf_paths = self.pdf_downloader.download_all(papers)
+        self.fulltext.index_pdfs(papers, pdf_paths)
+    
+    def translate_papers(self, papers, scores):
+        """残り文字数の中で関連度の高い論文を優先して、タイトルと要約をまとめて翻訳
+        
+        翻訳の前に、論文ごとに全文・冒頭の数文のみ・翻訳しないのいずれかを決める。
+        全論文のタイトルと要約は1回のtranslate_batchに渡し、できるだけ少ないリクエストで翻訳する。
+        """
+        remaining = self.deepl.quota.remaining
+        plan = self.translation_planner.plan(papers, scores, remaining)
+        
+        texts = []
+        targets = []
+        for paper, (mode, count) in zip(papers, plan):
+            paper['translated_title'] = None
+            paper['translated_abstract'] = None
+            if mode == 'none':
+                print(f"⚠️ Skipping translation (insufficient quota): {paper['title'][:50]}...")
+                continue
+            
+            sentences = split_sentences(paper['abstract'])
+            if mode == 'partial':
+                print(f"✂️ Translating first {count}/{len(sentences)} sentences: {paper['title'][:50]}...")
+            texts.append(paper['title'])
+            texts.append(' '.join(sentences[:count]))
+            targets.append((paper, mode))
+        
+        if not texts:
+            return
+        
+        print(f"🔄 Translating {len(targets)} titles and abstracts in batch (remaining quota: {remaining:,} chars)...")
+        translations = self.deepl.translate_batch(texts)
+        for i, (paper, mode) in enumerate(targets):
+            translated_title, translated = translations[2 * i], translations[2 * i + 1]
+            if translated and mode == 'partial':
+                translated += "\n（冒頭のみ翻訳）"
+            paper['translated_title'] = translated_title
+            paper['translated_abstract'] = translated
+    
     def process_single_paper(self, paper, paper_num, total_papers):
-        """単一の論文を処理（翻訳・LINE・Notion）"""
+        """単一の論文を処理（LINE・Notion）"""
         print(f"\n📄 Processing paper {paper_num}/{total_papers}: {paper['title'][:50]}...")
         
-        # DeepL使用状況確認
-        usage = self.deepl.get_usage()
-        remaining = usage['remaining']
-        
-        # Abstract翻訳
-        abstract_chars = len(paper.get('abstract', ''))
-        if remaining >= abstract_chars:
-            print(f"🔄 Translating abstract ({abstract_chars} chars)...")
-            translated = self.deepl.translate_abstract(paper['abstract'])
-            if translated:
-                paper['translated_abstract'] = translated
-                print(f"✅ Translation completed")
-            else:
-                print(f"❌ Translation failed")
+        if paper.get('translated_abstract'):
+            print(f"✅ Abstract translated")
         else:
-            print(f"⚠️ Skipping translation (insufficient quota: need {abstract_chars}, have {remaining})")
-            paper['translated_abstract'] = None
+            print(f"⚠️ No translation available")
         
         # LINEに送信
         # 1つ目のメッセージ（基本情報）
@@ -121,54 +254,111 @@ class PaperNotificationSystem:
         self.line.send_message(abstract_message)
         time.sleep(MESSAGE_INTERVAL)
         
-        # Notionに保存
+        # Notionへの保存は送信待ちキューに追加（実行の最後にまとめて送信）
         if self.notion.is_enabled():
-            notion_page = self.notion.save_paper(paper)
-            if notion_page:
-                print(f"📝 Notion page created: {notion_page['id']}")
-                # 成功した場合、既存URLリストに追加（同じセッション内での重複防止）
-                paper_url = paper.get('pdf_url') or paper.get('url')
-                if paper_url:
-                    self.existing_urls.add(paper_url)
-            else:
-                print(f"❌ Failed to save to Notion")
+            # 全文インデックスがあればPDFの全文もページに保存
+            full_text = self.fulltext.get_text(paper['arxiv_id']) if self.fulltext and paper.get('url') else None
+            self.notion_outbox.enqueue(paper, full_text=full_text)
+            # 処理済みインデックスに追加（次回以降・同じセッション内での重複防止）
+            self.seen.add(paper, source='notion')
+        
+        # 通知済みの論文として近似重複インデックスに登録
+        self.near_duplicates.add(paper)
         
         print(f"✅ Paper {paper_num} processing completed")
         
         # 新規論文数をカウント
         self.processed_new_papers += 1
     
-    def search_translate_and_notify(self, query, max_results=2):
-        """論文を検索、翻訳してLINE・Notionで通知"""
-        print(f"🔍 Starting paper search for: '{query}'")
+    def flush_notion_outbox(self):
+        """送信待ちキューのNotionへの保存をまとめて実行（失敗したものは次回再送）"""
+        if not self.notion.is_enabled():
+            return
         
-        # arXivで検索（多めに取得してフィルタリング）
-        papers = self.arxiv.search_papers(query, max_results * 3)
+        saved, abandoned = self.notion_outbox.flush(self.notion_writer)
+        for paper, notion_page in saved:
+            print(f"📝 Notion page created: {notion_page['id']} ({paper.get('title', 'Unknown')[:50]})")
+        
+        # 再送をやめた論文は処理済みから外し、次回以降に再び選ばれるようにする
+        for paper, error in abandoned:
+            self.seen.remove(paper, source='notion')
+        if abandoned:
+            titles = "\n".join(f"・{paper.get('title', 'Unknown')[:80]}" for paper, _ in abandoned)
+            self.line.send_message(f"⚠️ Notionへの保存を{len(abandoned)}件あきらめました（次回以降に再取得します）\n{titles}")
+    
+    def select_papers(self, query, max_results=2, papers=None, matrix=None):
+        """論文を検索し、関連性・重複で絞り込んでBM25スコアの上位を選ぶ（papersを渡した場合は検索を省略）
+
+        matrixには、papersを含む取得済みの全論文から作成したTermMatrixを渡せる（なければpapersから作成）。
+        (選んだ論文, 関連はあるが選ばなかった論文) を返す。
+        """
+        if papers is None:
+            print(f"🔍 Starting paper search for: '{query}'")
+            
+            # arXivで検索（多めに取得してフィルタリング）
+            papers = self.arxiv.search_papers(query, max_results * 3)
         
         if not papers:
             print("❌ No papers found")
             self.line.send_message(f"「{query}」に関する論文が見つかりませんでした。")
-            return
+            return [], []
         
         print(f"✅ Found {len(papers)} papers")
         
-        # 関連性フィルタリング
-        relevant_papers = self.filter_relevant_papers(papers, query)
+        # 取得した全論文を1回だけ単語分割し、コーパス統計を更新
+        if matrix is None:
+            matrix = self.ranker.build_matrix(papers)
+        
+        # 関連性フィルタリング（同じ実行で別のキーワードに選んだ論文も除外）
+        relevant_papers = [
+            paper for paper in self.filter_relevant_papers(papers, query)
+            if not self.selected_keys.intersection(paper_keys(paper))
+        ]
         
         if not relevant_papers:
             print("❌ No relevant papers found after filtering")
             self.line.send_message(f"「{query}」に関連する論文が見つかりませんでした。")
-            return
+            return [], []
         
-        # 必要な数まで絞り込み
-        papers = relevant_papers[:max_results]
+        # 関連のある論文の行だけをBM25でスコア付けし、高い順に必要な数まで絞り込み
+        row_of = {id(paper): i for i, paper in enumerate(matrix.papers)}
+        candidates = matrix.select([row_of[id(paper)] for paper in relevant_papers])
+        papers = self.ranker.rank(candidates, [query], max_results)[query]
+        for paper in papers:
+            self.selected_keys.update(paper_keys(paper))
         print(f"📋 Using {len(papers)} relevant papers")
+        selected = {id(paper) for paper in papers}
+        return papers, [paper for paper in relevant_papers if id(paper) not in selected]
+    
+    def prepare_papers(self, selections):
+        """その日に選んだ全論文の全文インデックス・図表・翻訳をまとめて行う
+
+        selectionsは [(キーワード, [論文, ...]), ...]。翻訳の計画は全論文をまとめて立てる。
+        """
+        papers = [paper for _, query_papers in selections for paper in query_papers]
+        if not papers:
+            return
+        
+        # 全文インデックス
+        self.index_full_text(papers)
+        
+        # 図表画像をキャッシュ（無効・重複した画像を除外）
+        if self.figure_cache:
+            self.figure_cache.cache_images(papers)
         
         # DeepL使用状況確認
         usage = self.deepl.get_usage()
         print(f"📊 DeepL usage: {usage['used']:,} / {usage['limit']:,} characters")
         print(f"📊 Remaining: {usage['remaining']:,} characters")
         
+        # 要約をまとめて翻訳（関連度スコアが低くても翻訳の価値が0にならないように1を足す）
+        scores = np.concatenate([
+            self.ranker.score_papers(query_papers, query) + 1.0 for query, query_papers in selections
+        ])
+        self.translate_papers(papers, scores)
+    
+    def notify_papers(self, papers):
+        """翻訳済みの論文をLINE・Notionで通知"""
         # ヘッダーメッセージ送信
         header = f"🔬 本日の論文情報 ({len(papers)}件)\n" + "="*30
         self.line.send_message(header)
@@ -179,9 +369,6 @@ class PaperNotificationSystem:
             self.process_single_paper(paper, i, len(papers))
         
         print(f"\n🎉 All {len(papers)} papers processed and sent!")
-        
-        # 新規論文数の上限チェック
-        return self.processed_new_papers >= MAX_NEW_PAPERS_PER_DAY
 
 def main():
     try:
@@ -192,27 +379,77 @@ def main():
         # システム初期化
         system = PaperNotificationSystem()
         
+        # バッチ検索：全キーワード分を一度に取得してキーワードごとに振り分け
+        batch_results = None
+        batch_matrix = None
+        if SEARCH_MODE == "batch":
+            print(f"🔍 Starting batch paper search for {len(SEARCH_KEYWORDS)} keywords")
+            harvested = []
+            batch_results = system.arxiv.search_papers_batch(SEARCH_KEYWORDS, PAPERS_PER_KEYWORD * 3, fetched=harvested)
+            # 振り分けられなかった論文も含めて1回だけ単語分割し、コーパス統計を更新
+            batch_matrix = system.ranker.build_matrix(harvested)
+        
+        # キーワードごとに通知する論文を選ぶ（1日の上限数まで）
+        selections = []
+        # 差分取得の結果（キーワード, 取得した論文, 選ばなかった関連論文, ウォーターマークまで取得できたか）。通知後にウォーターマークを進める
+        fetched = []
+        remaining = MAX_NEW_PAPERS_PER_DAY
         for query in SEARCH_KEYWORDS:
             print(f"\n{'='*60}")
-            print(f"Processing query: {query}")
-            print(f"新規論文処理数: {system.processed_new_papers}/{MAX_NEW_PAPERS_PER_DAY}")
+            print(f"Selecting papers for query: {query}")
+            print(f"選択済みの新規論文数: {MAX_NEW_PAPERS_PER_DAY - remaining}/{MAX_NEW_PAPERS_PER_DAY}")
             print('='*60)
             
             # 上限に達していたら終了
-            if system.processed_new_papers >= MAX_NEW_PAPERS_PER_DAY:
-                print(f"🎯 Daily limit reached ({MAX_NEW_PAPERS_PER_DAY} new papers processed)")
+            if remaining <= 0:
+                print(f"🎯 Daily limit reached ({MAX_NEW_PAPERS_PER_DAY} new papers selected)")
                 break
             
-            should_stop = system.search_translate_and_notify(query, max_results=PAPERS_PER_KEYWORD)
+            prefetched = None
+            if SEARCH_MODE == "batch":
+                prefetched = batch_results[query]
+            elif SEARCH_MODE == "incremental":
+                prefetched, complete = system.arxiv.search_new_papers(query, INCREMENTAL_MAX_RESULTS)
+            papers, pending = system.select_papers(query, max_results=min(PAPERS_PER_KEYWORD, remaining), papers=prefetched,
+                                                   matrix=batch_matrix)
+            if SEARCH_MODE == "incremental":
+                fetched.append((query, prefetched, pending, complete))
+                # 画像は選んだ論文のみ取得
+                system.arxiv.attach_images(papers)
+            if papers:
+                selections.append((query, papers))
+                remaining -= len(papers)
             
+            # バッチ検索時はAPIを呼ばないので待機不要
+            if SEARCH_MODE != "batch":
+                time.sleep(QUERY_INTERVAL)
+        
+        # 選んだ全論文の翻訳をまとめて計画・実行
+        system.prepare_papers(selections)
+        
+        # キーワードごとに通知
+        for query, papers in selections:
+            print(f"\n{'='*60}")
+            print(f"Notifying papers for query: {query}")
+            print('='*60)
+            system.notify_papers(papers)
             print(f"✅ Query '{query}' completed")
-            
-            # 上限に達したら終了
-            if should_stop:
-                print(f"🎯 Daily limit reached ({MAX_NEW_PAPERS_PER_DAY} new papers processed)")
-                break
-                
-            time.sleep(QUERY_INTERVAL)
+        
+        # 通知した論文と、関連がなかった・重複だった論文の分だけウォーターマークを進める
+        for query, papers, pending, complete in fetched:
+            system.arxiv.commit_watermark(query, papers, pending, complete)
+        
+        # コーパス統計（上位k件の選択時に更新済み）を保存
+        system.ranker.stats.save()
+        
+        # 画像URLの確認結果を保存
+        system.arxiv.save_caches()
+        
+        # Notionへの保存をまとめて実行（送信用のスレッドプールは必ず終了する）
+        try:
+            system.flush_notion_outbox()
+        finally:
+            system.notion_writer.close()
         
         print(f"\n🎉 Paper Notification System completed successfully!")
         
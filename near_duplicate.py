@@ -0,0 +1,135 @@
+import hashlib
+import os
+import re
+import sqlite3
+import zlib
+import numpy as np
+
+class NearDuplicateIndex:
+    """タイトル・要約のMinHashによる近似重複検出（LSHインデックスをSQLiteに保存）
+
+    正規化したタイトルと要約の単語3-gramからMinHash署名を作り、
+    署名をバンドに分けたハッシュ値（LSHバケット）で候補を引く。
+    候補の数は登録件数によらずほぼ一定なので、1件あたりの判定は登録件数に比例しない。
+    バージョン違い（v1/v2）やクロスリスト、別の情報源から見つかった同じ論文を検出する。
+    """
+
+    TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+    # ハッシュ関数の法（2^32より大きい素数）
+    PRIME = 4294967311
+
+    def __init__(self, db_path="./cache/near_duplicates.sqlite", num_perm=128, bands=16, threshold=0.7,
+                 shingle_size=3, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.db_path = db_path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+
+        # 署名を保存済みのものと比較するため、ハッシュ関数の係数は固定の乱数で作る
+        random_state = np.random.RandomState(seed)
+        self.a = random_state.randint(1, 2 ** 31, size=num_perm).astype(np.uint64)
+        self.b = random_state.randint(0, 2 ** 31, size=num_perm).astype(np.uint64)
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            " key TEXT PRIMARY KEY,"
+            " title TEXT NOT NULL,"
+            " signature BLOB NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " band INTEGER NOT NULL,"
+            " bucket INTEGER NOT NULL,"
+            " key TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS buckets_band_bucket ON buckets (band, bucket)")
+        self.conn.commit()
+
+    def shingles(self, paper):
+        """正規化したタイトル・要約の単語n-gram（短い文章は単語単位）"""
+        text = (paper.get('title', '') + ' ' + paper.get('abstract', '')).lower()
+        tokens = self.TOKEN_PATTERN.findall(text)
+        size = self.shingle_size if len(tokens) >= self.shingle_size else 1
+        return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+    def signature(self, paper):
+        """MinHash署名（num_perm個のuint64）。単語がなければNone"""
+        shingles = self.shingles(paper)
+        if not shingles:
+            return None
+        values = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        # 各ハッシュ関数 (a * x + b) mod p の最小値
+        return ((self.a[:, None] * values[None, :] + self.b[:, None]) % self.PRIME).min(axis=1)
+
+    def _buckets(self, signature):
+        """バンドごとのバケット番号（SQLiteの整数に収まる符号付き64bit）"""
+        return [
+            (band, int.from_bytes(
+                hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(), digest_size=8).digest(),
+                'big', signed=True
+            ))
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def similarity(signature, other):
+        """署名から推定したJaccard類似度"""
+        return float(np.mean(signature == other))
+
+    def find(self, paper, signature=None):
+        """登録済みの近似重複を探す（見つかれば (キー, タイトル, 類似度)、なければNone）"""
+        if signature is None:
+            signature = self.signature(paper)
+        if signature is None:
+            return None
+
+        candidates = set()
+        for band, bucket in self._buckets(signature):
+            candidates.update(
+                key for (key,) in self.conn.execute(
+                    "SELECT key FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)
+                )
+            )
+
+        best = None
+        for key in candidates:
+            title, blob = self.conn.execute(
+                "SELECT title, signature FROM signatures WHERE key = ?", (key,)
+            ).fetchone()
+            score = self.similarity(signature, np.frombuffer(blob, dtype=np.uint64))
+            if score >= self.threshold and (best is None or score > best[2]):
+                best = (key, title, score)
+        return best
+
+    def add(self, paper, key=None):
+        """論文を登録（同じキーは置き換え）"""
+        key = key or paper.get('url') or paper.get('pdf_url')
+        signature = self.signature(paper)
+        if not key or signature is None:
+            return False
+
+        self.conn.execute("DELETE FROM buckets WHERE key = ?", (key,))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO signatures (key, title, signature) VALUES (?, ?, ?)",
+            (key, paper.get('title', ''), signature.tobytes())
+        )
+        self.conn.executemany(
+            "INSERT INTO buckets (band, bucket, key) VALUES (?, ?, ?)",
+            [(band, bucket, key) for band, bucket in self._buckets(signature)]
+        )
+        self.conn.commit()
+        return True
+
+    def close(self):
+        self.conn.close()
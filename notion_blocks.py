@@ -0,0 +1,123 @@
+# rich_textの1要素あたりの最大文字数
+MAX_TEXT_LENGTH = 2000
+
+# 1つのrich_text配列の最大要素数
+MAX_RICH_TEXT_ITEMS = 100
+
+# 1リクエストで送れる最大ブロック数
+MAX_BLOCKS_PER_REQUEST = 100
+
+# 1ブロック・1リクエストあたりの本文のバイト数の目安（リクエスト全体の上限は500KB）
+MAX_BLOCK_BYTES = 100 * 1000
+MAX_REQUEST_BYTES = 400 * 1000
+
+def split_text(text, limit=MAX_TEXT_LENGTH):
+    """テキストをlimit文字以下に分割（できるだけ改行・空白の位置で区切る）"""
+    while len(text) > limit:
+        cut = max(text.rfind('\n', 0, limit), text.rfind(' ', 0, limit))
+        if cut <= 0:
+            cut = limit
+        else:
+            cut += 1
+        yield text[:cut]
+        text = text[cut:]
+    if text:
+        yield text
+
+def rich_text(text, href=None):
+    """rich_textの要素のリスト（長いテキストは複数要素に分割）"""
+    items = []
+    for chunk in split_text(text):
+        item = {"type": "text", "text": {"content": chunk}}
+        if href:
+            item["text"]["link"] = {"url": href}
+        items.append(item)
+    return items
+
+def heading(text):
+    return {
+        "object": "block",
+        "type": "heading_2",
+        "heading_2": {"rich_text": rich_text(text)[:1]}
+    }
+
+def paragraph(items):
+    return {
+        "object": "block",
+        "type": "paragraph",
+        "paragraph": {"rich_text": items}
+    }
+
+def text_bytes(items):
+    """rich_textの本文のバイト数（UTF-8）"""
+    return sum(len(item["text"]["content"].encode('utf-8')) for item in items)
+
+def block_bytes(block):
+    return text_bytes(block[block["type"]]["rich_text"])
+
+def paragraphs(text):
+    """テキストの段落ブロック（1ブロックの要素数・サイズが上限を超える場合は複数ブロックに分ける）"""
+    items = []
+    size = 0
+    for item in rich_text(text):
+        item_size = text_bytes([item])
+        if items and (len(items) >= MAX_RICH_TEXT_ITEMS or size + item_size > MAX_BLOCK_BYTES):
+            yield paragraph(items)
+            items = []
+            size = 0
+        items.append(item)
+        size += item_size
+    if items:
+        yield paragraph(items)
+
+def section(title, text):
+    """見出しと本文のブロック"""
+    yield heading(title)
+    yield from paragraphs(text)
+
+def iter_paper_blocks(paper, full_text=None, max_figures=5):
+    """論文ページの本文ブロックを順に生成"""
+    # 著者情報
+    if paper.get('authors_str'):
+        yield from section("Authors", paper['authors_str'])
+
+    # 英語論文（オリジナル）
+    if paper.get('abstract'):
+        yield from section("English Abstract", paper['abstract'])
+
+    # DeepL翻訳済み論文
+    if paper.get('translated_abstract'):
+        if paper.get('translated_title'):
+            yield from section("Japanese Title (DeepL)", paper['translated_title'])
+        yield from section("Japanese Translation (DeepL)", paper['translated_abstract'])
+
+    # 図表
+    if paper.get('images'):
+        yield heading("Figures")
+        images = paper['images'] if max_figures is None else paper['images'][:max_figures]
+        for i, img in enumerate(images, 1):
+            # 画像URL
+            yield paragraph([{"type": "text", "text": {"content": f"Figure {i}: "}}] + rich_text(img['url'], img['url']))
+
+            # キャプション（ある場合）
+            if img.get('caption'):
+                yield from paragraphs(f"Caption: {img['caption']}")
+
+    # 全文（PDFから抽出したテキスト）
+    if full_text:
+        yield from section("Full Text", full_text)
+
+def batched(blocks, size=MAX_BLOCKS_PER_REQUEST, max_bytes=MAX_REQUEST_BYTES):
+    """ブロックをリクエストごとのリストにまとめる（ブロック数とサイズの上限を守る）"""
+    batch = []
+    batch_bytes = 0
+    for block in blocks:
+        current_bytes = block_bytes(block)
+        if batch and (len(batch) >= size or batch_bytes + current_bytes > max_bytes):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(block)
+        batch_bytes += current_bytes
+    if batch:
+        yield batch
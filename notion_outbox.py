@@ -0,0 +1,163 @@
+import json
+import os
+import sqlite3
+import time
+from seen_index import paper_keys
+from notion_saver import PartialPageError
+
+class NotionOutbox:
+    """Notionへの書き込み待ちを保存する永続キュー（SQLite）
+
+    保存する論文は先にキューに書き込み、あとからまとめてNotionに送信する。
+    送信に失敗したものはキューに残り、次回の実行で再送する。
+    キーは論文のバージョンなしarXiv ID（なければURL）なので、同じ論文を二重に登録しない。
+    """
+
+    def __init__(self, db_path="./cache/notion_outbox.sqlite", max_attempts=10):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self.conn = sqlite3.connect(db_path)
+        # 書き込み途中で終了してもキューが壊れないようにWALモードにする
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " key TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " last_error TEXT,"
+            " page_id TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS outbox_status ON outbox (status, created_at)")
+        self.conn.commit()
+
+    @staticmethod
+    def key_for(paper):
+        """冪等性キー（バージョンなしのarXiv ID、なければURL）"""
+        keys = sorted(paper_keys(paper))
+        arxiv_keys = [key for key in keys if key.startswith('arxiv:')]
+        if arxiv_keys:
+            return arxiv_keys[0]
+        return keys[0] if keys else 'title:' + paper.get('title', '')
+
+    def enqueue(self, paper, search_keyword=None, full_text=None):
+        """論文の保存をキューに追加（登録済みの論文は無視、再送をやめた論文は送信待ちに戻す）"""
+        data = paper.to_dict() if hasattr(paper, 'to_dict') else dict(paper)
+        payload = json.dumps({'paper': data, 'search_keyword': search_keyword, 'full_text': full_text},
+                             ensure_ascii=False)
+        key = self.key_for(paper)
+        now = time.time()
+        # 戻す場合は試行回数を1にして、作成済みのページがないか確認してから送信させる
+        self.conn.execute(
+            "INSERT INTO outbox (key, payload, status, created_at, updated_at)"
+            " VALUES (?, ?, 'pending', ?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET payload = excluded.payload, status = 'pending', attempts = 1,"
+            " updated_at = excluded.updated_at WHERE outbox.status = 'failed'",
+            (key, payload, now, now)
+        )
+        self.conn.commit()
+        return key
+
+    def pending(self, limit=None):
+        """送信待ちの一覧（登録順、(キー, 内容, 試行回数, 作成済みのページID)）"""
+        query = "SELECT key, payload, attempts, page_id FROM outbox WHERE status = 'pending' ORDER BY created_at"
+        params = ()
+        if limit:
+            query += " LIMIT ?"
+            params = (limit,)
+        return [
+            (key, json.loads(payload), attempts, page_id)
+            for key, payload, attempts, page_id in self.conn.execute(query, params)
+        ]
+
+    def count_pending(self):
+        return self.conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def mark_attempt(self, key):
+        """送信前に試行回数を記録（送信中に終了した場合も、次回はNotion側を確認してから再送する）"""
+        self.conn.execute("UPDATE outbox SET attempts = attempts + 1, updated_at = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+
+    def mark_done(self, key, page_id):
+        self.conn.execute(
+            "UPDATE outbox SET status = 'done', page_id = ?, last_error = NULL, updated_at = ? WHERE key = ?",
+            (page_id, time.time(), key)
+        )
+        self.conn.commit()
+
+    def mark_failed(self, key, error, page_id=None):
+        """失敗を記録（max_attempts回失敗したものは再送をやめる）
+
+        page_idは本文の途中まで作成できたページ（次回はこのページに残りを追加する）。
+        再送をやめた場合はTrueを返す。
+        """
+        self.conn.execute(
+            "UPDATE outbox SET last_error = ?, updated_at = ?, page_id = COALESCE(?, page_id),"
+            " status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END WHERE key = ?",
+            (str(error), time.time(), page_id, self.max_attempts, key)
+        )
+        self.conn.commit()
+        row = self.conn.execute("SELECT status FROM outbox WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] == 'failed'
+
+    def flush(self, writer, batch_size=50):
+        """送信待ちをまとめてNotionに送信し、(保存できた論文のリスト, 再送をやめた論文のリスト) を返す
+
+        writerはNotionWriter。以前に送信を試みたもの（attempts > 0）は作成済みの可能性があるため、
+        Notionに同じURLのページがないか確認してから作成する。
+        本文の途中で失敗したページは完了にせず、次回そのページに残りのブロックを追加する。
+        """
+        saved = []
+        abandoned = []
+        failed_keys = set()
+        while True:
+            entries = [entry for entry in self.pending(batch_size + len(failed_keys)) if entry[0] not in failed_keys]
+            if not entries:
+                break
+            entries = entries[:batch_size]
+
+            futures = []
+            for key, payload, attempts, page_id in entries:
+                self.mark_attempt(key)
+                future = writer.submit(payload['paper'], payload['search_keyword'], payload['full_text'],
+                                       check_existing=attempts > 0, page_id=page_id)
+                futures.append((key, payload, future))
+
+            for key, payload, future in futures:
+                partial_page_id = None
+                try:
+                    page = future.result()
+                    error = None if page else "Notion integration disabled"
+                except PartialPageError as e:
+                    page = None
+                    error = e
+                    partial_page_id = e.page['id']
+                except Exception as e:
+                    page = None
+                    error = e
+
+                if page:
+                    self.mark_done(key, page.get('id'))
+                    saved.append((payload['paper'], page))
+                else:
+                    if self.mark_failed(key, error, partial_page_id):
+                        print(f"🚨 Notion outbox: giving up on '{payload['paper'].get('title', 'Unknown')[:50]}'"
+                              f" after {self.max_attempts} attempts: {error}")
+                        abandoned.append((payload['paper'], error))
+                    # 同じflushの中では再送しない（次回の実行で再送）
+                    failed_keys.add(key)
+
+        remaining = self.count_pending()
+        if saved or remaining or abandoned:
+            print(f"📮 Notion outbox: {len(saved)} saved, {remaining} pending, {len(abandoned)} abandoned")
+        return saved, abandoned
+
+    def close(self):
+        self.conn.close()
@@ -1,14 +1,64 @@
 import os
+import itertools
+import random
+import threading
+import time
 from notion_client import Client
+from notion_client.errors import HTTPResponseError, RequestTimeoutError
+from notion_blocks import batched, iter_paper_blocks, rich_text
 from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
 
+class TokenBucket:
+    """トークンバケットによるレート制限（スレッドセーフ）
+
+    平均 rate 回/秒、最大 capacity 回まで連続で許可する。
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """トークンを1つ取得（なければ補充されるまで待つ）"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+class PartialPageError(Exception):
+    """ページは作成できたが、本文のブロックの一部を追加できなかった"""
+
+    def __init__(self, page, error):
+        super().__init__(f"page {page['id']} was created without some content: {error}")
+        self.page = page
+
 class NotionSaver:
-    def __init__(self):
+    # Notion APIの平均リクエスト数の上限（3回/秒）
+    REQUESTS_PER_SECOND = 3.0
+    
+    # リトライ対象のステータスコード
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    
+    def __init__(self, max_retries=5, max_backoff=60.0):
         self.notion_token = os.getenv('NOTION_TOKEN')
         self.notion_database_id = os.getenv('NOTION_DATABASE_ID')
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        
+        # 全スレッド共通のレート制限
+        self.rate_limiter = TokenBucket(self.REQUESTS_PER_SECOND, self.REQUESTS_PER_SECOND)
         
         if self.notion_token and self.notion_database_id:
             self.notion = Client(auth=self.notion_token)
@@ -21,27 +71,92 @@ class NotionSaver:
         """Notion連携が有効かどうか"""
         return self.notion is not None
     
-    def get_existing_urls(self):
-        """データベースから既存のURLを取得"""
+    def request(self, method, idempotent=True, find_existing=None, **kwargs):
+        """Notion APIを呼び出す（レート制限・429/5xxのリトライ付き）
+
+        ページ作成のように冪等でない呼び出しはidempotent=Falseにする。
+        5xxやタイムアウトではサーバー側で処理済みの可能性があるため、
+        find_existing()で処理済みの結果を探してあればそれを返し、探せなければリトライしない。
+        """
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                return method(**kwargs)
+            except (HTTPResponseError, RequestTimeoutError) as e:
+                status = getattr(e, 'status', None)
+                if attempt >= self.max_retries or (status is not None and status not in self.RETRY_STATUSES):
+                    raise
+                
+                # 429は処理されていないので、冪等でなくてもそのままリトライしてよい
+                if not idempotent and status != 429:
+                    if find_existing is None:
+                        raise
+                    existing = find_existing()
+                    if existing:
+                        print("📝 Notion request had already been applied, not retrying")
+                        return existing
+                
+                # Retry-Afterがあれば優先、なければジッター付き指数バックオフ
+                retry_after = e.headers.get('Retry-After', '') if status is not None else ''
+                if retry_after.isdigit():
+                    delay = min(int(retry_after), self.max_backoff)
+                else:
+                    delay = min(2 ** attempt * random.uniform(0.5, 1.5), self.max_backoff)
+                print(f"⏳ Notion API {status or 'timeout'}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+    
+    def get_property_id(self, name):
+        """データベースのプロパティIDを取得（filter_properties用）"""
+        if not self.notion:
+            return None
+        
+        try:
+            database = self.request(self.notion.databases.retrieve, database_id=self.notion_database_id)
+            prop = database.get("properties", {}).get(name)
+            return prop.get("id") if prop else None
+        except Exception as e:
+            print(f"⚠️ Error getting Notion property ID: {e}")
+            return None
+    
+    def get_urls_since(self, since=None, url_property_id=None):
+        """指定時刻以降に作成・編集されたページのURLを取得
+        
+        since: 前回の同期カーソル（last_edited_timeのISO形式、Noneなら全件）
+        url_property_id: URLプロパティのID（指定するとURLプロパティのみ取得）
+        戻り値は (URLの集合, 次回の同期カーソル)。エラーの場合はNone。
+        """
         if not self.notion:
-            return set()
+            return None
         
         try:
-            existing_urls = set()
+            urls = set()
+            cursor = since
             has_more = True
             start_cursor = None
             
             while has_more:
-                # データベースをクエリ
+                # 編集日時の古い順に取得（作成時もlast_edited_timeが設定される）
                 query_params = {
                     "database_id": self.notion_database_id,
-                    "page_size": 100
+                    "page_size": 100,
+                    "sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}]
                 }
                 
+                # last_edited_timeは分単位に丸められるため、同じ時刻のページも含めて取得する
+                if since:
+                    query_params["filter"] = {
+                        "timestamp": "last_edited_time",
+                        "last_edited_time": {"on_or_after": since}
+                    }
+                
+                # 必要なプロパティのみ取得
+                if url_property_id:
+                    query_params["filter_properties"] = [url_property_id]
+                
                 if start_cursor:
                     query_params["start_cursor"] = start_cursor
                 
-                response = self.notion.databases.query(**query_params)
+                response = self.request(self.notion.databases.query, **query_params)
                 
                 # 各ページのURLプロパティを取得
                 for page in response["results"]:
@@ -49,25 +164,78 @@ class NotionSaver:
                     url_prop = properties.get("URL", {})
                     
                     if url_prop.get("type") == "url" and url_prop.get("url"):
-                        existing_urls.add(url_prop["url"])
+                        urls.add(url_prop["url"])
+                    
+                    if page.get("last_edited_time") and (cursor is None or page["last_edited_time"] > cursor):
+                        cursor = page["last_edited_time"]
                 
                 # 次のページがあるかチェック
                 has_more = response.get("has_more", False)
                 start_cursor = response.get("next_cursor")
             
-            print(f"📊 Found {len(existing_urls)} existing papers in Notion database")
-            return existing_urls
+            return urls, cursor
             
         except Exception as e:
-            print(f"❌ Error getting existing URLs: {e}")
-            return set()
+            print(f"❌ Error getting URLs from Notion: {e}")
+            return None
+    
+    def find_page_by_url(self, url):
+        """URLプロパティが一致するページを取得（なければNone）"""
+        if not self.notion or not url:
+            return None
+        
+        response = self.request(
+            self.notion.databases.query,
+            database_id=self.notion_database_id,
+            page_size=1,
+            filter={"property": "URL", "url": {"equals": url}}
+        )
+        return response["results"][0] if response["results"] else None
+    
+    def count_children(self, block_id):
+        """ブロック（ページ）の直下の子ブロック数"""
+        count = 0
+        cursor = None
+        while True:
+            kwargs = {'block_id': block_id, 'page_size': 100}
+            if cursor:
+                kwargs['start_cursor'] = cursor
+            response = self.request(self.notion.blocks.children.list, **kwargs)
+            count += len(response["results"])
+            if not response.get("has_more"):
+                return count
+            cursor = response["next_cursor"]
+    
+    def append_batches(self, page, batches, offset):
+        """ブロックのまとまりを順にページに追加（offsetはページに既にある子ブロック数）
+
+        追加は冪等でないため、5xxやタイムアウトの後は子ブロック数を確認し、
+        追加済みならリトライしない。途中で失敗した場合はPartialPageErrorを送出する。
+        """
+        try:
+            for children in batches:
+                expected = offset + len(children)
+                self.request(
+                    self.notion.blocks.children.append,
+                    idempotent=False,
+                    find_existing=lambda: self.count_children(page["id"]) >= expected,
+                    block_id=page["id"],
+                    children=children
+                )
+                offset = expected
+        except Exception as e:
+            print(f"⚠️ Notion block append error (page created without some content): {e}")
+            raise PartialPageError(page, e) from e
     
-    def is_duplicate(self, paper_url, existing_urls):
-        """論文URLが重複しているかチェック"""
-        return paper_url in existing_urls if paper_url else False
+    def resume_paper(self, page, paper, full_text=None):
+        """作成済みのページに、まだ追加されていない本文のブロックを追加"""
+        offset = self.count_children(page["id"])
+        remaining = itertools.islice(iter_paper_blocks(paper, full_text), offset, None)
+        self.append_batches(page, batched(remaining), offset)
+        return page
     
-    def save_paper(self, paper, search_keyword=None):
-        """論文情報をNotionに保存"""
+    def save_paper(self, paper, search_keyword=None, full_text=None):
+        """論文情報をNotionに保存（失敗時は例外）"""
         if not self.notion:
             return False
             
@@ -75,13 +243,7 @@ class NotionSaver:
             # Notionページのプロパティ設定
             properties = {
                 "NAME ": {  # Note the space after NAME
-                    "title": [
-                        {
-                            "text": {
-                                "content": paper.get('title', 'Unknown Title')
-                            }
-                        }
-                    ]
+                    "title": rich_text(paper.get('title', 'Unknown Title'))
                 },
                 "Read": {
                     "select": {
@@ -113,109 +275,29 @@ class NotionSaver:
                     "url": paper['pdf_url']
                 }
             
-            # ページコンテンツ（children）を作成
-            children = []
-            
-            # 著者情報
-            if paper.get('authors_str'):
-                children.extend([
-                    {
-                        "object": "block",
-                        "type": "heading_2",
-                        "heading_2": {
-                            "rich_text": [{"type": "text", "text": {"content": "Authors"}}]
-                        }
-                    },
-                    {
-                        "object": "block",
-                        "type": "paragraph",
-                        "paragraph": {
-                            "rich_text": [{"type": "text", "text": {"content": paper['authors_str']}}]
-                        }
-                    }
-                ])
-            
-            # 英語論文（オリジナル）
-            if paper.get('abstract'):
-                children.extend([
-                    {
-                        "object": "block",
-                        "type": "heading_2",
-                        "heading_2": {
-                            "rich_text": [{"type": "text", "text": {"content": "English Abstract"}}]
-                        }
-                    },
-                    {
-                        "object": "block",
-                        "type": "paragraph",
-                        "paragraph": {
-                            "rich_text": [{"type": "text", "text": {"content": paper['abstract']}}]
-                        }
-                    }
-                ])
-            
-            # DeepL翻訳済み論文
-            if paper.get('translated_abstract'):
-                children.extend([
-                    {
-                        "object": "block",
-                        "type": "heading_2",
-                        "heading_2": {
-                            "rich_text": [{"type": "text", "text": {"content": "Japanese Translation (DeepL)"}}]
-                        }
-                    },
-                    {
-                        "object": "block",
-                        "type": "paragraph",
-                        "paragraph": {
-                            "rich_text": [{"type": "text", "text": {"content": paper['translated_abstract']}}]
-                        }
-                    }
-                ])
+            # ページコンテンツ（children）をAPIの上限に合わせて分割して作成
+            batches = batched(iter_paper_blocks(paper, full_text))
+            first_batch = next(batches, [])
             
-            # 図表
-            if paper.get('images'):
-                children.append({
-                    "object": "block",
-                    "type": "heading_2",
-                    "heading_2": {
-                        "rich_text": [{"type": "text", "text": {"content": "Figures"}}]
-                    }
-                })
-                
-                for i, img in enumerate(paper['images'][:5], 1):  # 最大5個まで
-                    # 画像URL
-                    children.append({
-                        "object": "block",
-                        "type": "paragraph",
-                        "paragraph": {
-                            "rich_text": [
-                                {"type": "text", "text": {"content": f"Figure {i}: "}},
-                                {"type": "text", "text": {"content": img['url']}, "href": img['url']}
-                            ]
-                        }
-                    })
-                    
-                    # キャプション（ある場合）
-                    if img.get('caption'):
-                        children.append({
-                            "object": "block",
-                            "type": "paragraph",
-                            "paragraph": {
-                                "rich_text": [{"type": "text", "text": {"content": f"Caption: {img['caption']}"}}]
-                            }
-                        })
-            
-            # Notionページを作成
-            page = self.notion.pages.create(
+            # 最初のまとまりと一緒にNotionページを作成
+            # リトライの前に同じURLのページが作成済みでないか確認する（URLがなければリトライしない）
+            url = paper.get('pdf_url')
+            page = self.request(
+                self.notion.pages.create,
+                idempotent=False,
+                find_existing=(lambda: self.find_page_by_url(url)) if url else None,
                 parent={"database_id": self.notion_database_id},
                 properties=properties,
-                children=children
+                children=first_batch
             )
             
+            # 残りのブロックを追加
+            self.append_batches(page, batches, len(first_batch))
+            
             print(f"✅ Saved to Notion: {paper.get('title', 'Unknown')[:50]}...")
             return page
             
         except Exception as e:
+            # 送信待ちキューに実際のエラーを記録するため、呼び出し元に伝える
             print(f"❌ Notion save error: {e}")
-            return None
+            raise
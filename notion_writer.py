@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+
+class NotionWriter:
+    """Notionへのページ作成をワーカースレッドで並列に実行する
+
+    各リクエストはNotionSaverのレート制限（トークンバケット）を通るため、
+    多数の論文を保存する場合もAPIの上限（平均3回/秒）の速度で処理できる。
+    """
+
+    def __init__(self, saver, workers=3):
+        self.saver = saver
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def submit(self, paper, search_keyword=None, full_text=None, check_existing=False, page_id=None):
+        """ページ作成を登録（結果はFutureで受け取る。失敗時はFutureが例外を返す）
+
+        page_idを指定した場合は、作成済みのそのページに残りの本文を追加する。
+        check_existing=Trueなら、同じURLのページが既にあれば新しく作成せず、そのページの本文の不足分を追加する。
+        """
+        return self.executor.submit(self._save, paper, search_keyword, full_text, check_existing, page_id)
+
+    def _save(self, paper, search_keyword, full_text, check_existing, page_id):
+        if page_id:
+            print(f"📝 Resuming Notion page content: {paper.get('title', 'Unknown')[:50]}...")
+            return self.saver.resume_paper({'id': page_id}, paper, full_text)
+        if check_existing and paper.get('pdf_url'):
+            page = self.saver.find_page_by_url(paper['pdf_url'])
+            if page:
+                print(f"📝 Notion page already exists: {paper.get('title', 'Unknown')[:50]}...")
+                return self.saver.resume_paper(page, paper, full_text)
+        return self.saver.save_paper(paper, search_keyword, full_text)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
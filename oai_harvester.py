@@ -0,0 +1,229 @@
+import json
+import os
+import sqlite3
+import sys
+import xml.etree.ElementTree as ET
+from paper import Paper
+from http_client import get_shared_client
+
+class PaperStore:
+    """OAI-PMHで収集した論文メタデータのローカル保存先（SQLite）"""
+
+    def __init__(self, db_path="./cache/papers.sqlite"):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS papers ("
+            " arxiv_id TEXT PRIMARY KEY,"
+            " datestamp TEXT,"
+            " primary_category TEXT,"
+            " data TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS harvest_state ("
+            " set_spec TEXT PRIMARY KEY,"
+            " last_datestamp TEXT)"
+        )
+        self.conn.commit()
+
+    def upsert_papers(self, records):
+        """(datestamp, paper) のリストを保存（既存の論文は上書き）"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO papers (arxiv_id, datestamp, primary_category, data) VALUES (?, ?, ?, ?)",
+            [
+                (paper['arxiv_id'], datestamp, paper['primary_category'], json.dumps(paper.to_dict(include_derived=False), ensure_ascii=False))
+                for datestamp, paper in records
+            ]
+        )
+        self.conn.commit()
+
+    def get_last_datestamp(self, set_spec):
+        """前回収集した最新のdatestampを取得"""
+        row = self.conn.execute(
+            "SELECT last_datestamp FROM harvest_state WHERE set_spec = ?", (set_spec,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_last_datestamp(self, set_spec, datestamp):
+        """収集した最新のdatestampを記録"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO harvest_state (set_spec, last_datestamp) VALUES (?, ?)",
+            (set_spec, datestamp)
+        )
+        self.conn.commit()
+
+    def get_paper(self, arxiv_id):
+        """arXiv IDで論文を取得"""
+        row = self.conn.execute("SELECT data FROM papers WHERE arxiv_id = ?", (arxiv_id,)).fetchone()
+        return Paper.from_dict(json.loads(row[0])) if row else None
+
+    def iter_papers(self, since=None):
+        """保存済みの論文を1件ずつ返す（sinceでdatestampを絞り込み）"""
+        if since:
+            cursor = self.conn.execute("SELECT data FROM papers WHERE datestamp >= ? ORDER BY datestamp", (since,))
+        else:
+            cursor = self.conn.execute("SELECT data FROM papers ORDER BY datestamp")
+        for (data,) in cursor:
+            yield Paper.from_dict(json.loads(data))
+
+    def count(self):
+        """保存済みの論文数"""
+        return self.conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+class OaiHarvester:
+    """arXivのOAI-PMHインターフェースからカテゴリ単位で論文メタデータを一括収集"""
+
+    # 収集対象カテゴリ（ArxivScraper.search_papersと同じ気象・地球物理学カテゴリ）
+    DEFAULT_CATEGORIES = ['physics.ao-ph', 'physics.geo-ph']
+
+    # Namespace定義
+    NS = {
+        'oai': 'http://www.openarchives.org/OAI/2.0/',
+        'arXiv': 'http://arxiv.org/OAI/arXiv/'
+    }
+
+    def __init__(self, store=None, endpoint="https://oaipmh.arxiv.org/oai", timeout=(10, 120), http_client=None):
+        self.store = store if store is not None else PaperStore()
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+        # 共通HTTPクライアント（oaipmh.arxiv.orgのリクエスト間隔と503 Retry-Afterを処理）
+        self.http = http_client if http_client is not None else get_shared_client()
+
+    @staticmethod
+    def category_to_set(category):
+        """カテゴリ名をOAI-PMHのsetSpecに変換（例: physics.ao-ph → physics:physics:ao-ph）"""
+        archive = category.split('.')[0]
+        return f"{archive}:{category.replace('.', ':')}"
+
+    def fetch_page(self, params):
+        """ListRecordsを1ページ取得"""
+        response = self.http.get(self.endpoint, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return ET.fromstring(response.content)
+
+    def harvest(self, category, from_date=None):
+        """カテゴリの論文メタデータを収集して保存（resumptionTokenを辿る）"""
+        set_spec = self.category_to_set(category)
+        if from_date is None:
+            from_date = self.store.get_last_datestamp(set_spec)
+
+        params = {'verb': 'ListRecords', 'metadataPrefix': 'arXiv', 'set': set_spec}
+        if from_date:
+            params['from'] = from_date
+
+        total = 0
+        latest = from_date
+        while True:
+            root = self.fetch_page(params)
+
+            error = root.find('oai:error', self.NS)
+            if error is not None:
+                # 新しいレコードがない場合
+                if error.get('code') != 'noRecordsMatch':
+                    print(f"❌ OAI-PMH error: {error.get('code')} {error.text}")
+                break
+
+            list_records = root.find('oai:ListRecords', self.NS)
+            if list_records is None:
+                break
+
+            records = []
+            for record in list_records.findall('oai:record', self.NS):
+                header = record.find('oai:header', self.NS)
+                if header.get('status') == 'deleted':
+                    continue
+                metadata = record.find('oai:metadata/arXiv:arXiv', self.NS)
+                if metadata is None:
+                    continue
+
+                datestamp = header.findtext('oai:datestamp', '', self.NS)
+                records.append((datestamp, self.extract_paper_info_from_oai(metadata)))
+                if not latest or datestamp > latest:
+                    latest = datestamp
+
+            self.store.upsert_papers(records)
+            total += len(records)
+            print(f"📥 {set_spec}: {total} records harvested")
+
+            # 次のページ
+            token = list_records.findtext('oai:resumptionToken', '', self.NS).strip()
+            if not token:
+                break
+            params = {'verb': 'ListRecords', 'resumptionToken': token}
+
+        if latest:
+            self.store.set_last_datestamp(set_spec, latest)
+        return total
+
+    def harvest_all(self, categories=None, from_date=None):
+        """対象カテゴリをすべて収集"""
+        total = 0
+        for category in categories or self.DEFAULT_CATEGORIES:
+            try:
+                total += self.harvest(category, from_date)
+            except Exception as e:
+                print(f"❌ OAI-PMH harvest error ({category}): {e}")
+        return total
+
+    def extract_paper_info_from_oai(self, metadata):
+        """arXivメタデータ形式から論文情報を抽出（ArxivScraper.extract_paper_info_from_xmlと同じ形式）"""
+        ns = self.NS
+        paper = Paper()
+
+        def text(tag):
+            value = metadata.findtext(f'arXiv:{tag}', None, ns)
+            return ' '.join(value.split()) if value else None
+
+        # タイトル
+        paper['title'] = text('title') or ''
+
+        # 著者
+        authors = []
+        for author in metadata.findall('arXiv:authors/arXiv:author', ns):
+            parts = [
+                author.findtext('arXiv:forenames', '', ns).strip(),
+                author.findtext('arXiv:keyname', '', ns).strip(),
+                author.findtext('arXiv:suffix', '', ns).strip()
+            ]
+            authors.append(' '.join(part for part in parts if part))
+        paper['authors'] = authors
+
+        # Abstract
+        abstract = metadata.findtext('arXiv:abstract', '', ns)
+        paper['abstract'] = abstract.strip()
+
+        # 公開日・更新日
+        paper['published'] = text('created') or ''
+        paper['updated'] = text('updated') or paper['published']
+
+        # URL（arXiv IDはURLから生成）
+        arxiv_id = text('id') or ''
+        paper['url'] = f"http://arxiv.org/abs/{arxiv_id}"
+        paper['pdf_url'] = f"http://arxiv.org/pdf/{arxiv_id}"
+
+        # カテゴリ
+        categories = (text('categories') or '').split()
+        paper['categories'] = categories
+
+        # DOI・Journal reference・Comment
+        paper['doi'] = text('doi')
+        paper['journal_ref'] = text('journal-ref')
+        paper['comment'] = text('comments')
+
+        return paper
+
+def main(from_date=None):
+    harvester = OaiHarvester()
+    total = harvester.harvest_all(from_date=from_date)
+    print(f"🎉 Harvested {total} records ({harvester.store.count()} papers in local store)")
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
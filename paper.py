@@ -0,0 +1,116 @@
+class Paper:
+    """論文情報のレコード
+
+    __slots__で1件あたりのメモリを抑え、authors_strなどの派生項目は参照時に計算する。
+    既存コードとの互換のため、辞書と同じように paper['title'] や paper.get('images') で扱える。
+    """
+
+    # 保持する項目
+    FIELDS = (
+        'title', 'authors', 'abstract', 'published', 'updated', 'url', 'pdf_url',
+        'categories', 'doi', 'journal_ref', 'comment', 'images', 'translated_title', 'translated_abstract'
+    )
+
+    # 他の項目から計算する項目
+    DERIVED_FIELDS = ('authors_str', 'arxiv_id', 'primary_category')
+
+    __slots__ = FIELDS + ('_extra',)
+
+    def __init__(self, title='', authors=None, abstract='', published='', updated='', url='',
+                 categories=None, doi=None, journal_ref=None, comment=None, **optional):
+        self.title = title
+        self.authors = authors if authors is not None else []
+        self.abstract = abstract
+        self.published = published
+        self.updated = updated
+        self.url = url
+        self.categories = categories if categories is not None else []
+        self.doi = doi
+        self.journal_ref = journal_ref
+        self.comment = comment
+
+        # pdf_url・images などは存在する場合のみ設定（辞書でキーがない状態と同じ扱い）
+        for key, value in optional.items():
+            self[key] = value
+
+    @property
+    def authors_str(self):
+        return ', '.join(self.authors)
+
+    @property
+    def arxiv_id(self):
+        if not self.url:
+            raise AttributeError('arxiv_id')
+        return self.url.split('/')[-1]
+
+    @property
+    def primary_category(self):
+        return self.categories[0] if self.categories else ''
+
+    @classmethod
+    def from_dict(cls, data):
+        """辞書からPaperを作成（派生項目は無視）"""
+        return cls(**{key: value for key, value in data.items() if key not in cls.DERIVED_FIELDS})
+
+    def to_dict(self, include_derived=True):
+        """辞書に変換"""
+        return {
+            key: value for key, value in self.items()
+            if include_derived or key not in self.DERIVED_FIELDS
+        }
+
+    # ---- 辞書互換 ----
+
+    def __getitem__(self, key):
+        if key in self.FIELDS or key in self.DERIVED_FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        try:
+            return self._extra[key]
+        except (AttributeError, KeyError):
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        elif key in self.DERIVED_FIELDS:
+            raise KeyError(f"{key} is derived and cannot be set")
+        else:
+            # 想定外の項目は必要になった時だけ辞書を作って保持
+            try:
+                extra = self._extra
+            except AttributeError:
+                extra = self._extra = {}
+            extra[key] = value
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        keys = [key for key in self.FIELDS + self.DERIVED_FIELDS if key in self]
+        keys.extend(getattr(self, '_extra', {}))
+        return keys
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __repr__(self):
+        return f"Paper(arxiv_id={self.get('arxiv_id')!r}, title={self.title[:40]!r})"
@@ -0,0 +1,266 @@
+import json
+import os
+import re
+from collections import Counter, defaultdict
+import numpy as np
+from seen_index import ARXIV_URL_PATTERN
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+def normalize(token):
+    """簡易的に複数形のsを除く"""
+    return token[:-1] if len(token) > 3 and token.endswith('s') and not token.endswith('ss') else token
+
+def tokenize(text):
+    """小文字化して単語に分割"""
+    return [normalize(token) for token in TOKEN_PATTERN.findall(text.lower())]
+
+def paper_text(paper):
+    return paper.get('title', '') + ' ' + paper.get('abstract', '')
+
+def paper_key(paper):
+    """コーパス統計で論文を数えるキー（バージョンなしのarXiv ID。v1とv2は同じ論文として1回だけ数える）"""
+    url = paper.get('url') or ''
+    match = ARXIV_URL_PATTERN.search(url)
+    if match:
+        return 'arxiv:' + match.group(1).lower()
+    return url or paper.get('title', '')
+
+class CorpusStats:
+    """BM25用のコーパス統計（文書数・平均文書長・単語ごとの文書頻度）
+
+    過去に取得した論文で少しずつ更新し、ファイルに保存して次回以降も使う。
+    登録済みの論文IDは新しいものからmax_seen_ids件だけ記録する。
+    """
+
+    def __init__(self, stats_path="./cache/corpus_stats.json", max_seen_ids=20000):
+        self.stats_path = stats_path
+        self.max_seen_ids = max_seen_ids
+        self.doc_count = 0
+        self.total_length = 0
+        self.doc_freq = {}
+        # 登録済みの論文ID（登録順を保つためdictのキーとして持つ）
+        self.seen_ids = {}
+        self._load()
+
+    def _load(self):
+        try:
+            if os.path.exists(self.stats_path):
+                with open(self.stats_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.doc_count = data['doc_count']
+                self.total_length = data['total_length']
+                self.doc_freq = data['doc_freq']
+                self.seen_ids = dict.fromkeys(data['seen_ids'])
+        except Exception as e:
+            print(f"⚠️ Corpus stats load error: {e}")
+
+    def save(self):
+        try:
+            stats_dir = os.path.dirname(self.stats_path)
+            if stats_dir and not os.path.exists(stats_dir):
+                os.makedirs(stats_dir)
+
+            tmp_path = self.stats_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'doc_count': self.doc_count,
+                    'total_length': self.total_length,
+                    'doc_freq': self.doc_freq,
+                    'seen_ids': list(self.seen_ids)
+                }, f)
+            os.replace(tmp_path, self.stats_path)
+        except Exception as e:
+            print(f"⚠️ Corpus stats save error: {e}")
+
+    @property
+    def avg_length(self):
+        return self.total_length / self.doc_count if self.doc_count else 0.0
+
+    def mark_seen(self, key):
+        """論文IDを登録済みにする（上限を超えたら古いものから忘れる）"""
+        self.seen_ids[key] = None
+        while len(self.seen_ids) > self.max_seen_ids:
+            del self.seen_ids[next(iter(self.seen_ids))]
+
+    def add(self, key, terms, length):
+        """1件分の単語集合を統計に追加（同じ論文は1回だけ数える）"""
+        if not key or key in self.seen_ids:
+            return False
+        self.mark_seen(key)
+        self.doc_count += 1
+        self.total_length += length
+        for term in terms:
+            self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+        return True
+
+    def update(self, papers):
+        """未登録の論文を統計に追加"""
+        added = 0
+        for paper in papers:
+            tokens = tokenize(paper_text(paper))
+            added += self.add(paper_key(paper), set(tokens), len(tokens))
+        return added
+
+    def idf(self, terms):
+        """単語ごとのIDF（BM25の定義）"""
+        doc_freq = np.array([self.doc_freq.get(term, 0) for term in terms], dtype=np.float64)
+        return np.log1p((self.doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+class TermMatrix:
+    """候補論文の単語出現回数の疎行列（CSR形式、論文 × 単語）
+
+    単語分割は作成時に1回だけ行い、以降のスコア計算はNumPyの配列演算のみで行う。
+    """
+
+    def __init__(self, papers, stats=None):
+        self.papers = list(papers)
+
+        # 未知の単語には出現順に列番号を振る
+        raw_vocab = defaultdict()
+        raw_vocab.default_factory = raw_vocab.__len__
+        indptr = [0]
+        indices = []
+        data = []
+        for paper in self.papers:
+            counts = Counter(TOKEN_PATTERN.findall(paper_text(paper).lower()))
+            indices.extend(map(raw_vocab.__getitem__, counts))
+            data.extend(counts.values())
+            indptr.append(len(indices))
+
+        # 単語を正規化した列にまとめる（'track' と 'tracks' は同じ列）
+        self.vocab = {}
+        raw_to_column = np.array(
+            [self.vocab.setdefault(normalize(token), len(self.vocab)) for token in raw_vocab], dtype=np.int64
+        )
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = raw_to_column[np.asarray(indices, dtype=np.int64)] if indices else np.zeros(0, dtype=np.int64)
+        self.data = np.asarray(data, dtype=np.float64)
+        # 疎行列の各要素がどの論文のものか
+        self.rows = np.repeat(np.arange(len(self.papers)), np.diff(self.indptr))
+        self.doc_lengths = np.bincount(self.rows, weights=self.data, minlength=len(self.papers))
+
+        if stats is not None:
+            self._update_stats(stats)
+
+    def _update_stats(self, stats):
+        """同じ分割結果でコーパス統計を更新（未登録の論文のみ）"""
+        new_rows = [i for i, paper in enumerate(self.papers) if paper_key(paper) and paper_key(paper) not in stats.seen_ids]
+        if not new_rows:
+            return
+
+        # 論文ごとの（重複のない）単語を数えて文書頻度にする
+        is_new = np.zeros(len(self.papers), dtype=bool)
+        is_new[new_rows] = True
+        mask = is_new[self.rows]
+        pairs = np.sort(self.rows[mask] * len(self.vocab) + self.indices[mask])
+        pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+        doc_freq = np.bincount(pairs % len(self.vocab), minlength=len(self.vocab))
+
+        terms = list(self.vocab)
+        for column in np.flatnonzero(doc_freq):
+            stats.doc_freq[terms[column]] = stats.doc_freq.get(terms[column], 0) + int(doc_freq[column])
+        for i in new_rows:
+            stats.mark_seen(paper_key(self.papers[i]))
+        stats.doc_count += len(new_rows)
+        stats.total_length += int(self.doc_lengths[new_rows].sum())
+
+    def __len__(self):
+        return len(self.papers)
+
+    def select(self, rows):
+        """指定した行（論文）だけの行列を返す（単語分割はやり直さず、コーパス統計も更新しない）"""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        # 各行の要素の位置を連結したもの
+        positions = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths) + np.arange(lengths.sum())
+
+        matrix = TermMatrix.__new__(TermMatrix)
+        matrix.papers = [self.papers[i] for i in rows]
+        matrix.vocab = self.vocab
+        matrix.indptr = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        matrix.indices = self.indices[positions]
+        matrix.data = self.data[positions]
+        matrix.rows = np.repeat(np.arange(len(rows)), lengths)
+        matrix.doc_lengths = self.doc_lengths[rows]
+        return matrix
+
+    def columns(self, terms):
+        """指定した単語の列だけを取り出した出現回数の行列（論文数 × 単語数）"""
+        column_of = np.full(len(self.vocab), -1, dtype=np.int64)
+        for j, term in enumerate(terms):
+            if term in self.vocab:
+                column_of[self.vocab[term]] = j
+
+        targets = column_of[self.indices]
+        mask = targets >= 0
+        term_freq = np.zeros((len(self.papers), len(terms)))
+        # 正規化で同じ列になった単語の出現回数は足し合わせる
+        np.add.at(term_freq, (self.rows[mask], targets[mask]), self.data[mask])
+        return term_freq
+
+class PaperRanker:
+    """候補論文をキーワードに対してBM25でスコア付けし、キーワードごとに上位k件を返す
+
+    候補論文は1回だけ単語分割して疎行列（TermMatrix）にし、
+    すべてのキーワードのスコアを1回の行列積で計算する。
+    """
+
+    def __init__(self, stats=None, k1=1.5, b=0.75):
+        self.stats = stats if stats is not None else CorpusStats()
+        self.k1 = k1
+        self.b = b
+
+    def build_matrix(self, papers, update_stats=True):
+        """候補論文の疎行列を作成（update_stats=Trueならコーパス統計も更新）"""
+        return TermMatrix(papers, self.stats if update_stats else None)
+
+    def score(self, matrix, queries):
+        """スコア行列（論文数 × キーワード数）を計算"""
+        # キーワードに含まれる単語だけを列にする
+        query_tokens = [tokenize(query) for query in queries]
+        vocab = {}
+        for tokens in query_tokens:
+            for token in tokens:
+                vocab.setdefault(token, len(vocab))
+        if not len(matrix) or not vocab:
+            return np.zeros((len(matrix), len(queries)))
+
+        term_freq = matrix.columns(list(vocab))
+
+        # BM25
+        avg_length = self.stats.avg_length or max(matrix.doc_lengths.mean(), 1.0)
+        idf = self.stats.idf(list(vocab))
+        norm = self.k1 * (1 - self.b + self.b * matrix.doc_lengths / avg_length)
+        weights = idf * term_freq * (self.k1 + 1) / (term_freq + norm[:, None])
+
+        # キーワード × 単語 の行列との積で、全キーワードのスコアを一度に計算
+        query_matrix = np.zeros((len(vocab), len(queries)))
+        for j, tokens in enumerate(query_tokens):
+            for token in tokens:
+                query_matrix[vocab[token], j] += 1
+        return weights @ query_matrix
+
+    def rank(self, papers, queries, top_k=5, update_stats=True):
+        """キーワードごとにスコア上位k件の論文を返す（{キーワード: [論文, ...]}）
+
+        papersには論文のリストか、build_matrixで作成済みのTermMatrixを渡す。
+        """
+        matrix = papers if isinstance(papers, TermMatrix) else self.build_matrix(papers, update_stats)
+        scores = self.score(matrix, queries)
+
+        results = {}
+        for j, query in enumerate(queries):
+            # スコア順（同点は元の順序を維持）
+            top = np.argsort(-scores[:, j], kind='stable')[:top_k]
+            results[query] = [matrix.papers[i] for i in top]
+        return results
+
+    def score_papers(self, papers, query):
+        """1キーワードに対する各論文のスコア（コーパス統計は更新しない）"""
+        return self.score(self.build_matrix(papers, update_stats=False), [query])[:, 0]
+
+    def top_k(self, papers, query, k):
+        """1キーワード分の上位k件"""
+        return self.rank(papers, [query], k)[query]
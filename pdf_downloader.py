@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from http_client import get_shared_client
+
+class PdfDownloader:
+    """PDFのダウンロード管理
+
+    チャンク単位でディスクに書き出し、途中で止まったファイルはRangeリクエストで再開する。
+    再開時はIf-Rangeで保存時と同じ版であることを確認し、変わっていれば最初から取得し直す。
+    保存先はSHA-256のハッシュ値で決まるため、同じ内容のPDFは1つだけ保存される。
+    arXiv IDとハッシュ値の対応は index.json に記録する。
+    """
+
+    def __init__(self, download_dir="./downloads", workers=4, per_host_limit=2, chunk_size=64 * 1024,
+                 http_client=None, headers=None):
+        self.download_dir = download_dir
+        self.objects_dir = os.path.join(download_dir, "objects")
+        self.partial_dir = os.path.join(download_dir, "partial")
+        self.index_path = os.path.join(download_dir, "index.json")
+        self.workers = workers
+        self.per_host_limit = per_host_limit
+        self.chunk_size = chunk_size
+        self.headers = headers or {}
+        self.http = http_client if http_client is not None else get_shared_client()
+
+        for directory in (self.objects_dir, self.partial_dir):
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+
+        self._index_lock = threading.Lock()
+        self._index = self._load_index()
+
+        # ホストごとの同時ダウンロード数の制限
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
+
+    def _load_index(self):
+        """arXiv ID → ハッシュ値の対応表を読み込む"""
+        try:
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"⚠️ PDF index load error: {e}")
+        return {}
+
+    def _save_index(self):
+        """対応表を書き出す（ロック取得済みで呼ぶ）"""
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _host_slot(self, url):
+        host = urlparse(url).hostname or ''
+        with self._host_slots_lock:
+            return self._host_slots.setdefault(host, threading.BoundedSemaphore(self.per_host_limit))
+
+    def object_path(self, digest):
+        """ハッシュ値から保存先のパスを求める"""
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.pdf")
+
+    def get_path(self, arxiv_id):
+        """ダウンロード済みならPDFのパスを返す"""
+        with self._index_lock:
+            digest = self._index.get(arxiv_id)
+        if digest and os.path.exists(self.object_path(digest)):
+            return self.object_path(digest)
+        return None
+
+    def download(self, paper):
+        """PDFを1件ダウンロードして保存先のパスを返す（失敗時はNone）"""
+        arxiv_id = paper.get('arxiv_id')
+        pdf_url = paper.get('pdf_url')
+        if not arxiv_id or not pdf_url:
+            return None
+
+        existing = self.get_path(arxiv_id)
+        if existing:
+            return existing
+
+        partial_path = os.path.join(self.partial_dir, f"{arxiv_id.replace('/', '_')}.part")
+
+        try:
+            with self._host_slot(pdf_url):
+                digest = self._fetch(pdf_url, partial_path)
+        except Exception as e:
+            print(f"PDF download error ({arxiv_id}): {e}")
+            return None
+
+        self._remove(self._validator_path(partial_path))
+
+        # 同じ内容のPDFがあれば新しく保存しない
+        filepath = self.object_path(digest)
+        if os.path.exists(filepath):
+            os.remove(partial_path)
+        else:
+            if not os.path.exists(os.path.dirname(filepath)):
+                os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            os.replace(partial_path, filepath)
+
+        with self._index_lock:
+            self._index[arxiv_id] = digest
+            self._save_index()
+
+        print(f"PDF downloaded: {arxiv_id} → {filepath}")
+        return filepath
+
+    @staticmethod
+    def _validator_path(partial_path):
+        return partial_path + ".json"
+
+    @staticmethod
+    def _remove(path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _load_validator(self, partial_path, pdf_url):
+        """途中のファイルを取得した時のIf-Range用の値（ETagまたはLast-Modified、なければNone）"""
+        try:
+            with open(self._validator_path(partial_path), 'r', encoding='utf-8') as f:
+                validator = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if validator.get('url') != pdf_url:
+            return None
+        # 弱いETagはIf-Rangeに使えない
+        etag = validator.get('etag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return validator.get('last_modified')
+
+    def _save_validator(self, partial_path, pdf_url, response):
+        with open(self._validator_path(partial_path), 'w', encoding='utf-8') as f:
+            json.dump({
+                'url': pdf_url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }, f)
+
+    def _fetch(self, pdf_url, partial_path):
+        """途中まで保存済みなら続きから取得し、ファイル全体のSHA-256を返す"""
+        sha256 = hashlib.sha256()
+        offset = 0
+
+        # 版を確認できない途中のファイルは使わない
+        validator = self._load_validator(partial_path, pdf_url)
+        if validator is None:
+            self._remove(partial_path)
+
+        # 途中まで保存されている分をハッシュに反映
+        if os.path.exists(partial_path):
+            with open(partial_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                    sha256.update(chunk)
+                    offset += len(chunk)
+
+        headers = dict(self.headers)
+        if offset:
+            headers['Range'] = f"bytes={offset}-"
+            # サーバー側のファイルが変わっていれば、206ではなく200で全体が返る
+            headers['If-Range'] = validator
+
+        with self.http.get(pdf_url, headers=headers, stream=True, timeout=(10, 120)) as response:
+            if offset and response.status_code == 416:
+                # 保存済みの分がサーバー側のファイルと合わないので、最初から取得し直す
+                self._remove(partial_path)
+                self._remove(self._validator_path(partial_path))
+                return self._fetch(pdf_url, partial_path)
+
+            response.raise_for_status()
+
+            if offset and response.status_code == 206:
+                mode = 'ab'
+            else:
+                # 新規、またはファイルが変わった・Rangeに未対応の場合は最初から
+                sha256 = hashlib.sha256()
+                mode = 'wb'
+                self._save_validator(partial_path, pdf_url, response)
+
+            with open(partial_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if chunk:
+                        f.write(chunk)
+                        sha256.update(chunk)
+
+        return sha256.hexdigest()
+
+    def download_all(self, papers):
+        """複数のPDFを並列にダウンロード（結果は {arxiv_id: パス} 、論文の順序を維持）"""
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            paths = list(executor.map(self.download, papers))
+        return {
+            paper.get('arxiv_id'): path
+            for paper, path in zip(papers, paths)
+        }
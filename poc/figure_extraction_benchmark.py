@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+from urllib.parse import urljoin
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bs4 import BeautifulSoup
+from arxiv_scraper import ArxivScraper, HTML_PARSER
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'html')
+
+def legacy_extract(html, html_url, parser='html.parser'):
+    """以前の実装（8回のselect、線形探索の重複チェック、find_nextでのキャプション探索）"""
+    images = []
+    soup = BeautifulSoup(html, parser)
+
+    img_patterns = [
+        'img[src*="figure"]', 'img[src*="fig"]', 'img[alt*="Figure"]', 'img[alt*="Fig"]',
+        'img[src*="png"]', 'img[src*="jpg"]', 'img[src*="jpeg"]', 'img[src*="svg"]'
+    ]
+
+    def find_caption(img_tag):
+        parent = img_tag.parent
+        if parent:
+            caption = parent.find('figcaption')
+            if caption:
+                return caption.get_text().strip()
+            next_p = img_tag.find_next('p')
+            if next_p and len(next_p.get_text()) < 200:
+                text = next_p.get_text().strip()
+                if any(keyword in text.lower() for keyword in ['figure', 'fig.', 'caption']):
+                    return text
+        return ""
+
+    for pattern in img_patterns:
+        for img in soup.select(pattern):
+            src = img.get('src')
+            if src:
+                if src.startswith('//'):
+                    src = 'https:' + src
+                elif not src.startswith('http'):
+                    src = urljoin(html_url, src)
+                image_info = {'url': src, 'alt': img.get('alt', ''), 'caption': find_caption(img)}
+                if not any(existing['url'] == src for existing in images):
+                    images.append(image_info)
+
+    return images
+
+def synthetic_latexml_page(figures=150, paragraphs_per_section=40):
+    """LaTeXML形式（arxiv.org/html）を模した大きめのHTMLページを生成"""
+    parts = ['<html><head><title>Synthetic</title></head><body><article class="ltx_document">']
+    for i in range(1, figures + 1):
+        parts.append(f'<section class="ltx_section" id="S{i}"><h2>Section {i}</h2>')
+        for j in range(paragraphs_per_section):
+            parts.append(f'<div class="ltx_para"><p class="ltx_p">Paragraph {i}.{j} on typhoon intensity and '
+                         f'tropical cyclone structure with <span class="ltx_Math">x_{j}</span> terms.</p></div>')
+        if i % 3 == 0:
+            # 複数パネルの図（figcaptionが親要素の外にある）
+            parts.append(f'<figure class="ltx_figure" id="F{i}"><div class="ltx_flex_figure">'
+                         f'<div class="ltx_flex_cell"><img src="x{i}a.png" alt="Refer to caption"></div>'
+                         f'<div class="ltx_flex_cell"><img src="x{i}b.png" alt="Refer to caption"></div></div>'
+                         f'<figcaption class="ltx_caption">Figure {i}: Multi-panel view.</figcaption></figure>')
+        else:
+            parts.append(f'<figure class="ltx_figure" id="F{i}"><img src="figures/fig{i}.png" alt="Figure {i}">'
+                         f'<figcaption class="ltx_caption">Figure {i}: Storm track ensemble.</figcaption></figure>')
+        parts.append('</section>')
+    parts.append('</article></body></html>')
+    return '\n'.join(parts).encode('utf-8')
+
+def load_pages(paths):
+    """ベンチマーク対象のHTMLを読み込む（保存済みページ、なければ生成したページ）"""
+    if not paths and os.path.isdir(FIXTURE_DIR):
+        paths = sorted(os.path.join(FIXTURE_DIR, name) for name in os.listdir(FIXTURE_DIR) if name.endswith('.html'))
+
+    pages = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            pages.append((os.path.basename(path), f.read()))
+
+    if not pages:
+        pages.append(('synthetic-latexml (150 figures)', synthetic_latexml_page()))
+    return pages
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main(paths, repeat=3):
+    """保存済みのarXiv HTMLページで旧実装と単一走査の実装を比較"""
+    scraper = ArxivScraper()
+    html_url = "https://arxiv.org/html/0000.00000"
+
+    print(f"HTML parser for index_figures: {HTML_PARSER}\n")
+    for name, html in load_pages(paths):
+        legacy_time, legacy_images = best_time(lambda: legacy_extract(html, html_url), repeat)
+        new_time, new_images = best_time(lambda: scraper.index_figures(html, html_url), repeat)
+
+        # 採用される先頭5件が一致するか（URL）
+        same_urls = [img['url'] for img in legacy_images[:5]] == [img['url'] for img in new_images[:5]]
+
+        print(f"📄 {name} ({len(html) / 1024:.0f} KB, {len(new_images)} images)")
+        print(f"   legacy:        {legacy_time * 1000:8.1f} ms")
+        print(f"   index_figures: {new_time * 1000:8.1f} ms  (x{legacy_time / new_time:.1f})")
+        print(f"   top-5 URLs match: {'✅' if same_urls else '❌'}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,142 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from http_cache import ResponseCache
+from http_client import HttpClient
+
+# 圧縮が効かない本文（サイズでの削除順を確認するため）
+BODIES = {
+    '/fresh': b'fresh body',
+    '/stale': b'stale body',
+    '/stream': os.urandom(256 * 1024),
+}
+
+class EtagHandler(BaseHTTPRequestHandler):
+    """ETagを返し、If-None-Matchが一致すれば304を返すローカルサーバー"""
+
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append((self.path, self.headers.get('If-None-Match')))
+        body = BODIES[self.path]
+        etag = f'"{self.path.strip("/")}-v1"'
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+def cached_urls(cache):
+    return {url for url, in cache.conn.execute("SELECT url FROM responses")}
+
+def check_revalidation(base_url, tmp_dir):
+    """TTL内はキャッシュから返し、TTL切れは条件付きGETの304で保存済みの本文を返す"""
+    cache = ResponseCache(os.path.join(tmp_dir, 'revalidate.sqlite'), ttls=[(r'/fresh$', 3600), (r'/stale$', 0)])
+    client = HttpClient(host_intervals={}, cache=cache)
+    results = []
+
+    client.get(base_url + '/fresh')
+    response = client.get(base_url + '/fresh')
+    results.append(check(response.content == BODIES['/fresh'], "fresh entry returned from cache"))
+    results.append(check(
+        [path for path, _ in EtagHandler.requests_seen].count('/fresh') == 1,
+        "fresh entry not requested again"
+    ))
+
+    client.get(base_url + '/stale')
+    response = client.get(base_url + '/stale')
+    results.append(check(EtagHandler.requests_seen[-1] == ('/stale', '"stale-v1"'), "stale entry revalidated with If-None-Match"))
+    results.append(check(response.status_code == 200 and response.content == BODIES['/stale'], "304 answered with the cached body"))
+
+    cache.conn.close()
+    return results
+
+def check_eviction(tmp_dir):
+    """合計サイズが上限を超えたら最終アクセスが古いものから削除される"""
+    cache = ResponseCache(os.path.join(tmp_dir, 'evict.sqlite'), ttls=[(r'.', 3600)], max_bytes=2500)
+    bodies = {name: os.urandom(1000) for name in ('a', 'b', 'c')}
+    results = []
+
+    cache._insert('http://example.com/a', 200, {}, bodies['a'])
+    time.sleep(0.01)
+    cache._insert('http://example.com/b', 200, {}, bodies['b'])
+    time.sleep(0.01)
+    # aを読むとbより最近のアクセスになる
+    cache.lookup('http://example.com/a')
+    time.sleep(0.01)
+    cache._insert('http://example.com/c', 200, {}, bodies['c'])
+
+    urls = cached_urls(cache)
+    results.append(check(urls == {'http://example.com/a', 'http://example.com/c'}, f"least recently used entry evicted: {sorted(urls)}"))
+    response, _ = cache.lookup('http://example.com/a')
+    results.append(check(response.content == bodies['a'], "kept entry decompresses to the original body"))
+
+    cache.conn.close()
+    return results
+
+def check_tee_reader(base_url, tmp_dir):
+    """stream=Trueのレスポンスは最後まで読まれた時だけ保存される"""
+    cache = ResponseCache(os.path.join(tmp_dir, 'tee.sqlite'), ttls=[(r'/stream$', 3600)])
+    client = HttpClient(host_intervals={}, cache=cache)
+    url = base_url + '/stream'
+    results = []
+
+    # 途中で読むのをやめた場合は保存しない
+    with client.get(url, stream=True) as response:
+        next(response.iter_content(chunk_size=1024))
+    results.append(check(not cached_urls(cache), "partially read stream not cached"))
+
+    with client.get(url, stream=True) as response:
+        body = b''.join(response.iter_content(chunk_size=64 * 1024))
+    results.append(check(body == BODIES['/stream'], "streamed body passed through unchanged"))
+
+    requests_before = len(EtagHandler.requests_seen)
+    response = client.get(url, stream=True)
+    body = b''.join(response.iter_content(chunk_size=64 * 1024))
+    results.append(check(len(EtagHandler.requests_seen) == requests_before, "fully read stream served from cache"))
+    results.append(check(body == BODIES['/stream'], "cached stream body matches"))
+
+    cache.conn.close()
+    return results
+
+def main():
+    server = HTTPServer(('127.0.0.1', 0), EtagHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results = []
+            results += check_revalidation(base_url, tmp_dir)
+            results += check_eviction(tmp_dir)
+            results += check_tee_reader(base_url, tmp_dir)
+
+        print(f"\n{'🎉 All checks passed' if all(results) else '❌ Some checks failed'}")
+        return all(results)
+
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
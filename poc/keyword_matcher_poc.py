@@ -0,0 +1,65 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from keyword_matcher import KeywordMatcher
+from main import RELEVANCE_KEYWORDS
+
+QUERY = "typhoon eye"
+
+def old_matches(text, keywords):
+    """KeywordMatcher導入前の判定（小文字にしての部分一致）"""
+    text = text.lower()
+    return any(keyword.lower() in text for keyword in keywords)
+
+# 以前の部分一致と同じ結果になるべきテキスト
+AGREEING_TEXTS = [
+    "Rapid intensification of a Typhoon near Okinawa",
+    "Eye formation in idealized simulations",
+    "Tropical  Cyclone track uncertainty",        # フレーズの間の空白が複数
+    "Tropical\ncyclones over the western Pacific",  # 改行をまたぐフレーズと複数形
+    "Storms and winds in the boundary layer",     # 複数形
+    "Machine learning for weather forecasting",
+    "台風の強度予報に関する研究",
+    "熱帯低気圧の発生環境",
+    "A note on graph neural networks",
+    "Protein folding with diffusion models",
+    "",
+]
+
+# 単語単位の一致にしたことで意図的に結果が変わるテキスト（以前は誤って一致していた）
+WORD_BOUNDARY_TEXTS = [
+    "A window-based attention mechanism",          # wind ⊂ window
+    "Eyeglasses detection in photos",              # eye ⊂ eyeglasses
+    "Nonclimatemodel baselines",                   # climate ⊂ nonclimatemodel
+]
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+def main():
+    keywords = QUERY.split() + RELEVANCE_KEYWORDS
+    matcher = KeywordMatcher(keywords)
+    results = []
+
+    for text in AGREEING_TEXTS:
+        expected = old_matches(text, keywords)
+        actual = matcher.matches(text)
+        results.append(check(actual == expected, f"{actual!s:5} == substring  {text[:50]!r}"))
+
+    for text in WORD_BOUNDARY_TEXTS:
+        results.append(check(
+            old_matches(text, keywords) and not matcher.matches(text),
+            f"no partial-word match        {text[:50]!r}"
+        ))
+
+    found = matcher.find_all("Tropical\n  Cyclones and typhoon winds")
+    results.append(check(found == {'tropical cyclone', 'cyclone', 'typhoon', 'wind'}, f"find_all: {sorted(found)}"))
+    results.append(check(matcher.filter(["typhoon", "graph"]) == [True, False], "filter keeps input order"))
+
+    print(f"\n{'🎉 All checks passed' if all(results) else '❌ Some checks failed'}")
+    return all(results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
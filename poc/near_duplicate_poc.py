@@ -0,0 +1,75 @@
+import os
+import sys
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from near_duplicate import NearDuplicateIndex
+
+ABSTRACT = (
+    "We present a deep learning model for estimating the intensity of tropical cyclones from geostationary "
+    "satellite infrared imagery. The model combines a convolutional encoder with a temporal attention module "
+    "that tracks the evolution of the eye and the surrounding convection over the previous twelve hours. "
+    "Trained on best-track data for the western North Pacific from 2005 to 2020, it reduces the mean absolute "
+    "error of maximum sustained wind estimates by eighteen percent compared with the Dvorak technique, and it "
+    "remains accurate during rapid intensification."
+)
+
+ORIGINAL = {
+    'title': "Satellite-based tropical cyclone intensity estimation with temporal attention",
+    'abstract': ABSTRACT,
+    'url': "http://arxiv.org/abs/2405.00001v1",
+}
+
+# 同じ論文の改訂版（タイトルの表記と要約の一部を修正）
+REVISION = {
+    'title': "Satellite-Based Tropical Cyclone Intensity Estimation with Temporal Attention",
+    'abstract': ABSTRACT.replace("eighteen percent", "nineteen percent") + " Code is publicly available.",
+    'url': "http://arxiv.org/abs/2405.00001v2",
+}
+
+# 同じ分野の別の論文
+UNRELATED = {
+    'title': "Storm surge forecasting along the Japanese coast with graph neural networks",
+    'abstract': (
+        "Storm surge caused by typhoons is a major coastal hazard in Japan. We build a graph neural network over "
+        "tide gauge stations and train it on hindcast simulations driven by historical typhoon tracks. The network "
+        "forecasts surge heights six hours ahead and generalizes to storms that were not seen during training."
+    ),
+    'url': "http://arxiv.org/abs/2405.00002v1",
+}
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'near_duplicates.sqlite')
+        index = NearDuplicateIndex(db_path)
+        results = []
+
+        shingles = [index.shingles(paper) for paper in (ORIGINAL, REVISION)]
+        jaccard = len(shingles[0] & shingles[1]) / len(shingles[0] | shingles[1])
+        estimate = index.similarity(index.signature(ORIGINAL), index.signature(REVISION))
+        results.append(check(abs(estimate - jaccard) < 0.1, f"MinHash estimate {estimate:.2f} ~ Jaccard {jaccard:.2f}"))
+
+        results.append(check(index.find(REVISION) is None, "empty index finds nothing"))
+        index.add(ORIGINAL)
+
+        found = index.find(REVISION)
+        results.append(check(found is not None and found[0] == ORIGINAL['url'], f"revision flagged as near duplicate: {found}"))
+        results.append(check(index.find(UNRELATED) is None, "unrelated paper not flagged"))
+
+        # 署名の係数は固定なので、保存済みのインデックスを開き直しても同じ判定になる
+        index.close()
+        reopened = NearDuplicateIndex(db_path)
+        found = reopened.find(REVISION)
+        results.append(check(found is not None and found[0] == ORIGINAL['url'], "same result after reopening the index"))
+        results.append(check(reopened.find({'title': '', 'abstract': ''}) is None, "empty text ignored"))
+        reopened.close()
+
+    print(f"\n{'🎉 All checks passed' if all(results) else '❌ Some checks failed'}")
+    return all(results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,97 @@
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from oai_harvester import OaiHarvester, PaperStore
+from http_client import HttpClient
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'oai')
+
+class RecordedOaiHandler(BaseHTTPRequestHandler):
+    """記録済みのOAI-PMHレスポンスを返すローカルのスタンドインエンドポイント"""
+
+    requests_seen = []
+
+    def do_GET(self):
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        self.requests_seen.append(params)
+
+        if params.get('resumptionToken') == 'page2token':
+            fixture = 'page2.xml'
+        elif params.get('from'):
+            fixture = 'no_records.xml'
+        else:
+            fixture = 'page1.xml'
+
+        with open(os.path.join(FIXTURE_DIR, fixture), 'rb') as f:
+            body = f.read()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+def main():
+    server = HTTPServer(('127.0.0.1', 0), RecordedOaiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = PaperStore(os.path.join(tmp_dir, 'papers.sqlite'))
+            harvester = OaiHarvester(
+                store=store,
+                endpoint=f"http://127.0.0.1:{server.server_port}/oai",
+                http_client=HttpClient(host_intervals={})
+            )
+
+            results = []
+
+            # 1回目：resumptionTokenを辿って2ページ分を収集
+            total = harvester.harvest('physics.ao-ph')
+            results.append(check(total == 2, f"harvested {total} records (deleted record skipped)"))
+            results.append(check(len(RecordedOaiHandler.requests_seen) == 2, "followed resumption token"))
+            results.append(check(
+                RecordedOaiHandler.requests_seen[0].get('set') == 'physics:physics:ao-ph',
+                "requested physics:physics:ao-ph set"
+            ))
+
+            # 既存のpaper辞書と同じ形式か
+            paper = store.get_paper('2405.00001')
+            expected_keys = {
+                'title', 'authors', 'authors_str', 'abstract', 'published', 'updated', 'url',
+                'arxiv_id', 'pdf_url', 'categories', 'primary_category', 'doi', 'journal_ref', 'comment'
+            }
+            results.append(check(set(paper) == expected_keys, "paper dict has the ArxivScraper shape"))
+            results.append(check(paper['title'] == 'Deep learning for typhoon intensity prediction', "title whitespace normalized"))
+            results.append(check(paper['authors_str'] == 'Hana Tanaka, John Smith Jr', f"authors: {paper['authors_str']}"))
+            results.append(check(paper['primary_category'] == 'physics.ao-ph', "primary category"))
+            results.append(check(store.get_paper('2405.00003')['updated'] == '2024-05-04', "updated date"))
+
+            # 2回目：前回のdatestampからの差分収集
+            total = harvester.harvest('physics.ao-ph')
+            results.append(check(total == 0, "incremental harvest found no new records"))
+            results.append(check(RecordedOaiHandler.requests_seen[-1].get('from') == '2024-05-04', "resumed from last datestamp"))
+
+            store.close()
+
+        print(f"\n{'🎉 All checks passed' if all(results) else '❌ Some checks failed'}")
+        return all(results)
+
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from quota_ledger import QuotaLedger
+
+class FakeUsageApi:
+    """呼び出し回数を数えるDeepLの使用状況APIのスタンドイン"""
+
+    def __init__(self, used, limit):
+        self.used = used
+        self.limit = limit
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("usage endpoint unreachable")
+        return self.used, self.limit
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        state_path = os.path.join(tmp_dir, 'quota.json')
+        results = []
+
+        # 使用状況はAPIから1回だけ取得し、以降はローカルで差し引く
+        api = FakeUsageApi(used=1000, limit=500000)
+        ledger = QuotaLedger(api, state_path=state_path)
+        results.append(check(ledger.remaining == 499000, "remaining from the first usage call"))
+        ledger.consume(1200)
+        ledger.consume(300)
+        results.append(check(ledger.remaining == 497500, f"consumed locally: {ledger.remaining} remaining"))
+        results.append(check(api.calls == 1, f"usage API called {api.calls} time(s)"))
+        results.append(check(ledger.usage() == {'used': 2500, 'limit': 500000, 'remaining': 497500}, "usage() has get_usage shape"))
+
+        # 突き合わせではAPIの値で置き換える（他の実行での使用分も反映される）
+        api.used = 4000
+        results.append(check(ledger.reconcile() and ledger.remaining == 496000, "reconcile replaces the local count"))
+
+        # reconcile_intervalを過ぎたら次の参照時に突き合わせる
+        api.used = 5000
+        ledger.reconcile_interval = 0
+        results.append(check(ledger.remaining == 495000 and api.calls == 3, "stale ledger reconciles on access"))
+
+        # APIに接続できない場合は保存済みの値を使う
+        api.fail = True
+        offline = QuotaLedger(api, state_path=state_path)
+        results.append(check(offline.remaining == 495000, "offline: falls back to the saved state"))
+        calls = api.calls
+        offline.consume(100)
+        results.append(check(api.calls == calls and offline.remaining == 494900, "failed check not retried on every call"))
+
+        # 保存済みの値もなければ残り0として扱う（翻訳しない）
+        unknown = QuotaLedger(api, state_path=os.path.join(tmp_dir, 'missing.json'))
+        results.append(check(unknown.remaining == 0, "no usage and no state: remaining is 0"))
+
+    print(f"\n{'🎉 All checks passed' if all(results) else '❌ Some checks failed'}")
+    return all(results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,58 @@
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from seen_index import SeenPaperIndex, paper_keys
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = SeenPaperIndex(os.path.join(tmp_dir, 'seen.sqlite'))
+        results = []
+
+        keys = paper_keys({'url': 'http://arxiv.org/abs/2405.00001v2', 'pdf_url': 'http://arxiv.org/pdf/2405.00001v2',
+                           'doi': '10.1000/ABC'})
+        results.append(check('arxiv:2405.00001' in keys and 'doi:10.1000/abc' in keys, f"version-less arXiv ID and DOI keys: {sorted(keys)}"))
+        results.append(check(
+            'arxiv:physics/0601001' in paper_keys(url='https://arxiv.org/abs/physics/0601001v3'),
+            "old-style arXiv ID"
+        ))
+
+        # 別バージョン・PDFのURL・DOIのいずれでも処理済みと判定
+        index.add({'url': 'http://arxiv.org/abs/2405.00001v1', 'doi': '10.1000/abc'}, source='notion')
+        results.append(check(index.contains(url='https://arxiv.org/pdf/2405.00001v3'), "other version's PDF URL is seen"))
+        results.append(check(index.contains({'url': 'https://doi.org/x', 'doi': '10.1000/ABC'}), "same DOI is seen"))
+        results.append(check(not index.contains(url='http://arxiv.org/abs/2405.00002v1'), "other paper is not seen"))
+
+        # Notionとの突き合わせで記録したURL
+        added = index.add_urls(['https://arxiv.org/abs/2405.00003', 'https://example.com/paper/'])
+        results.append(check(added == 3, f"add_urls recorded {added} keys"))
+        results.append(check(index.contains(url='https://example.com/paper'), "trailing slash ignored"))
+
+        # 記録元ごとの削除（保存できなかった論文を再び処理対象にする）
+        index.add(url='http://arxiv.org/abs/2405.00004v1', source='local')
+        index.remove(url='http://arxiv.org/abs/2405.00004v1', source='notion')
+        results.append(check(index.contains(url='http://arxiv.org/abs/2405.00004v1'), "remove keeps keys from other sources"))
+        index.remove(url='http://arxiv.org/abs/2405.00001v1', source='notion')
+        results.append(check(not index.contains(url='http://arxiv.org/abs/2405.00001v2'), "remove drops the paper's notion keys"))
+
+        # 同期間隔
+        results.append(check(index.sync_due(3600) and index.notion_cursor is None, "never synced: sync due"))
+        index.mark_synced('2024-05-04T00:00:00.000Z')
+        results.append(check(not index.sync_due(3600), "just synced: sync not due"))
+        index.set_meta('notion_synced_at', str(time.time() - 7200))
+        results.append(check(index.sync_due(3600), "interval elapsed: sync due"))
+        results.append(check(index.notion_cursor == '2024-05-04T00:00:00.000Z', "cursor kept"))
+
+        index.close()
+
+    print(f"\n{'🎉 All checks passed' if all(results) else '❌ Some checks failed'}")
+    return all(results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
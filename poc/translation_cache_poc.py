@@ -0,0 +1,86 @@
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# DeepLには接続しないので、APIキーはダミーでよい
+os.environ.setdefault('DEEPL_API_KEY', 'dummy:fx')
+
+from deepl_translator import DeepLTranslator
+from quota_ledger import QuotaLedger
+from translation_cache import TranslationCache, split_sentences
+
+class FakeDeepL:
+    """送られた文を記録し、「訳:」を付けて返すDeepLのスタンドイン"""
+
+    def __init__(self):
+        self.sent = []
+
+    def translate_text(self, texts, target_lang):
+        self.sent.append(list(texts))
+        return [SimpleNamespace(text=f"訳:{text}") for text in texts]
+
+    def get_usage(self):
+        return SimpleNamespace(character=SimpleNamespace(count=0, limit=500000))
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+def check_split_sentences():
+    """略語・イニシャルの後では文を区切らない"""
+    results = []
+    text = ("Smith et al. (2020) used e.g. Fig. 3 data.  We follow J. Smith.\n"
+            "Results improve by 5%. 2D fields are shown in Sect. 4 of the paper.")
+    expected = [
+        "Smith et al. (2020) used e.g. Fig. 3 data.",
+        "We follow J. Smith.",
+        "Results improve by 5%.",
+        "2D fields are shown in Sect. 4 of the paper.",
+    ]
+    sentences = split_sentences(text)
+    results.append(check(sentences == expected, f"split into {len(sentences)} sentences"))
+    results.append(check(split_sentences("") == [], "empty text has no sentences"))
+    return results
+
+def check_translator(tmp_dir):
+    """文単位のキャッシュ：改訂版の要約では変更された文だけを送る"""
+    results = []
+    translator = DeepLTranslator(target_lang="JA", cache=TranslationCache(os.path.join(tmp_dir, 'translations.sqlite')))
+    fake = FakeDeepL()
+    translator.translator = fake
+    translator.quota = QuotaLedger(translator.fetch_usage, state_path=os.path.join(tmp_dir, 'quota.json'))
+
+    v1 = "Typhoons are intense. We model their eyes. Results are good."
+    v2 = "Typhoons are intense. We model their eyes. Results are very good."
+
+    first = translator.translate_batch([v1, v1, ""])
+    results.append(check(first[0] == "訳:Typhoons are intense.訳:We model their eyes.訳:Results are good.",
+                         "Japanese target joins sentences without spaces"))
+    results.append(check(first[1] == first[0] and first[2] is None, "duplicate text reused, empty text skipped"))
+    results.append(check(fake.sent == [split_sentences(v1)], "each sentence sent once"))
+    results.append(check(translator.quota.used == len(''.join(split_sentences(v1))), f"quota consumed {translator.quota.used} chars"))
+
+    results.append(check(translator.translation_cost([v2]) == len("Results are very good."), "cost counts only the changed sentence"))
+    translator.translate_batch([v2])
+    results.append(check(fake.sent[-1] == ["Results are very good."], "revision sends only the changed sentence"))
+
+    requests_before = len(fake.sent)
+    translator.translate_batch([v1, "  Typhoons are   intense. We model their eyes.\nResults are good."])
+    results.append(check(len(fake.sent) == requests_before, "whitespace variants served from cache"))
+
+    translator.cache.close()
+    return results
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = []
+        results += check_split_sentences()
+        results += check_translator(tmp_dir)
+
+    print(f"\n{'🎉 All checks passed' if all(results) else '❌ Some checks failed'}")
+    return all(results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
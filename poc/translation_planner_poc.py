@@ -0,0 +1,92 @@
+import itertools
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from translation_planner import TranslationPlanner
+
+def sentence(word, length=100):
+    """指定した文字数の1文"""
+    return (word + ' ' + 'x' * length)[:length - 1] + '.'
+
+def abstract(word, count):
+    return ' '.join(sentence(f"{word.capitalize()}{i}") for i in range(count))
+
+PAPERS = [
+    {'abstract': abstract('alpha', 4)},  # 全文400文字
+    {'abstract': abstract('beta', 3)},   # 全文300文字
+    {'abstract': abstract('gamma', 2)},  # 全文200文字
+]
+SCORES = [3.0, 2.5, 2.0]
+
+def plan_value(planner, papers, scores, plan):
+    """計画の (価値, 費用)"""
+    value = cost = 0
+    for paper, score, (mode, count) in zip(papers, scores, plan):
+        for option in planner.options(paper['abstract'], score, paper.get('title')):
+            if option[:2] == (mode, count):
+                cost += option[2]
+                value += option[3]
+    return value, cost
+
+def brute_force(planner, papers, scores, budget):
+    """全組み合わせから予算内で価値が最大のもの"""
+    all_options = [planner.options(paper['abstract'], score, paper.get('title')) for paper, score in zip(papers, scores)]
+    best = None
+    for combination in itertools.product(*all_options):
+        cost = sum(option[2] for option in combination)
+        value = sum(option[3] for option in combination)
+        if cost <= budget and (best is None or value > best[0] + 1e-9):
+            best = (value, [(option[0], option[1]) for option in combination])
+    return best
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+def main():
+    planner = TranslationPlanner()
+    results = []
+
+    # 予算が足りれば全て全文翻訳
+    plan = planner.plan(PAPERS, SCORES, 10000)
+    results.append(check(plan == [('full', 4), ('full', 3), ('full', 2)], f"ample budget: {plan}"))
+
+    # スコア順に全文翻訳していく貪欲法では alpha(400) + 残り100で gamma の冒頭1文 → 価値 3.0 + 0.8 = 3.8。
+    # 最適解は beta・gamma を全文（500文字）で価値 4.5
+    plan = planner.plan(PAPERS, SCORES, 500)
+    value, cost = plan_value(planner, PAPERS, SCORES, plan)
+    results.append(check(plan == [('none', 0), ('full', 3), ('full', 2)], f"tight budget picks the knapsack optimum: {plan}"))
+    results.append(check(cost <= 500 and abs(value - 4.5) < 1e-9, f"value {value:.2f} at cost {cost}"))
+
+    # いくつかの予算で全探索と同じ価値になり、予算を超えない
+    for budget in (0, 99, 100, 250, 450, 640, 899):
+        plan = planner.plan(PAPERS, SCORES, budget)
+        value, cost = plan_value(planner, PAPERS, SCORES, plan)
+        best_value, _ = brute_force(planner, PAPERS, SCORES, budget)
+        results.append(check(cost <= budget and abs(value - best_value) < 1e-9,
+                             f"budget {budget:>3}: value {value:.2f} (optimum {best_value:.2f}), cost {cost}"))
+
+    # 表を小さくして費用を切り上げても予算は超えない
+    coarse = TranslationPlanner(max_units=7)
+    plan = coarse.plan(PAPERS, SCORES, 640)
+    _, cost = plan_value(coarse, PAPERS, SCORES, plan)
+    results.append(check(cost <= 640, f"coarse units stay within budget: cost {cost}, plan {plan}"))
+
+    # タイトルの翻訳費用も含める
+    titled = [dict(paper, title='t' * 100) for paper in PAPERS]
+    plan = planner.plan(titled, SCORES, 500)
+    _, cost = plan_value(planner, titled, SCORES, plan)
+    results.append(check(cost <= 500, f"title cost included: cost {cost}, plan {plan}"))
+
+    # キャッシュ済みの文は費用0（翻訳済みの論文は安く翻訳できる）
+    cached = {sentence(f"Alpha{i}") for i in range(4)}
+    cheap = TranslationPlanner(cost_fn=lambda sentences: sum(len(s) for s in sentences if s not in cached))
+    plan = cheap.plan(PAPERS, SCORES, 500)
+    results.append(check(plan == [('full', 4), ('full', 3), ('full', 2)], f"cached sentences cost nothing: {plan}"))
+
+    print(f"\n{'🎉 All checks passed' if all(results) else '❌ Some checks failed'}")
+    return all(results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
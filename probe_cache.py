@@ -0,0 +1,70 @@
+import json
+import os
+import threading
+import time
+
+class ProbeCache:
+    """arXiv画像URLの存在確認結果（あり/なし）を保存するキャッシュ
+
+    論文ごとに最後に確認した時刻を記録し、保存時にmax_ageより古いものと、
+    max_papers件を超えた分（確認が古い順）を削除する。
+    """
+
+    def __init__(self, cache_path="./cache/source_image_probes.json", max_age=30 * 24 * 3600, max_papers=5000):
+        self.cache_path = cache_path
+        self.max_age = max_age
+        self.max_papers = max_papers
+        self._lock = threading.Lock()
+        self._entries, self._checked_at = self._load()
+
+    def _load(self):
+        """キャッシュファイルを読み込む"""
+        try:
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if 'entries' in data:
+                    return data['entries'], data['checked_at']
+                # 確認時刻のない以前の形式は読み込んだ時点を確認時刻とする
+                now = time.time()
+                return data, {arxiv_id: now for arxiv_id in data}
+        except Exception as e:
+            print(f"⚠️ Probe cache load error: {e}")
+        return {}, {}
+
+    def get(self, arxiv_id, filename):
+        """確認結果を取得（未確認ならNone）"""
+        with self._lock:
+            return self._entries.get(arxiv_id, {}).get(filename)
+
+    def set(self, arxiv_id, filename, exists):
+        """確認結果を記録"""
+        with self._lock:
+            self._entries.setdefault(arxiv_id, {})[filename] = bool(exists)
+            self._checked_at[arxiv_id] = time.time()
+
+    def prune(self):
+        """古い確認結果を削除（ロック取得済みで呼ぶ）"""
+        cutoff = time.time() - self.max_age
+        ordered = sorted(self._checked_at, key=self._checked_at.get, reverse=True)
+        keep = [arxiv_id for arxiv_id in ordered[:self.max_papers] if self._checked_at[arxiv_id] >= cutoff]
+        self._entries = {arxiv_id: self._entries[arxiv_id] for arxiv_id in keep if arxiv_id in self._entries}
+        self._checked_at = {arxiv_id: self._checked_at[arxiv_id] for arxiv_id in keep}
+
+    def save(self):
+        """古い確認結果を削除してファイルに書き出す（実行の最後に1回呼ぶ）"""
+        with self._lock:
+            try:
+                self.prune()
+
+                cache_dir = os.path.dirname(self.cache_path)
+                if cache_dir and not os.path.exists(cache_dir):
+                    os.makedirs(cache_dir)
+
+                # 書き込み途中で壊れないよう一時ファイル経由で置き換える
+                tmp_path = self.cache_path + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'entries': self._entries, 'checked_at': self._checked_at}, f)
+                os.replace(tmp_path, self.cache_path)
+            except Exception as e:
+                print(f"⚠️ Probe cache save error: {e}")
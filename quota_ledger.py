@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+import time
+
+class QuotaLedger:
+    """DeepLの文字数クォータのローカル台帳
+
+    使用状況はAPIから1回だけ取得し、以降は翻訳した文字数をローカルで差し引く。
+    一定時間ごと、または翻訳エラーの後にAPIと突き合わせる。
+    最後に取得した使用状況はファイルに保存し、取得に失敗した場合はその値を使う。
+    """
+
+    def __init__(self, fetch_usage, state_path="./cache/deepl_quota.json", reconcile_interval=3600):
+        # fetch_usage: (used, limit) を返す関数（失敗時は例外）
+        self.fetch_usage = fetch_usage
+        self.state_path = state_path
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.Lock()
+        self.used = None
+        self.limit = None
+        self.reconciled_at = None
+
+    def _load_state(self):
+        """前回保存した使用状況（同じ月のもののみ）"""
+        try:
+            if os.path.exists(self.state_path):
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if state.get('month') == time.strftime('%Y-%m'):
+                    return state
+        except Exception as e:
+            print(f"⚠️ DeepL quota state load error: {e}")
+        return None
+
+    def _save_state(self):
+        try:
+            state_dir = os.path.dirname(self.state_path)
+            if state_dir and not os.path.exists(state_dir):
+                os.makedirs(state_dir)
+            with open(self.state_path, 'w', encoding='utf-8') as f:
+                json.dump({'month': time.strftime('%Y-%m'), 'used': self.used, 'limit': self.limit}, f)
+        except Exception as e:
+            print(f"⚠️ DeepL quota state save error: {e}")
+
+    def reconcile(self):
+        """APIから使用状況を取得してローカルの値を置き換える"""
+        try:
+            used, limit = self.fetch_usage()
+        except Exception as e:
+            print(f"⚠️ Could not check DeepL usage: {e}")
+            with self._lock:
+                if self.used is None:
+                    # 取得できない場合は前回の値を使い、それもなければ翻訳しない
+                    state = self._load_state()
+                    self.used, self.limit = (state['used'], state['limit']) if state else (0, 0)
+                    if not state:
+                        print("⚠️ DeepL usage unknown, treating remaining quota as 0")
+                # 次の確認まで待つ（失敗のたびにAPIを呼ばない）
+                self.reconciled_at = time.monotonic()
+            return False
+
+        with self._lock:
+            self.used, self.limit = used, limit
+            self.reconciled_at = time.monotonic()
+            self._save_state()
+        return True
+
+    def _ensure_fresh(self):
+        if self.reconciled_at is None or time.monotonic() - self.reconciled_at >= self.reconcile_interval:
+            self.reconcile()
+
+    def consume(self, characters):
+        """翻訳した文字数を差し引く"""
+        self._ensure_fresh()
+        with self._lock:
+            self.used += characters
+            self._save_state()
+
+    @property
+    def remaining(self):
+        """残り文字数（通常はメモリ上の値を返すだけ）"""
+        self._ensure_fresh()
+        with self._lock:
+            return max(self.limit - self.used, 0)
+
+    def usage(self):
+        """使用状況（DeepLTranslator.get_usageと同じ形式）"""
+        self._ensure_fresh()
+        with self._lock:
+            return {'used': self.used, 'limit': self.limit, 'remaining': max(self.limit - self.used, 0)}
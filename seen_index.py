@@ -0,0 +1,124 @@
+import os
+import re
+import sqlite3
+import time
+
+# arXivのURL（abs/pdf、新旧のID形式）からバージョンなしのIDを取り出す
+ARXIV_URL_PATTERN = re.compile(
+    r'arxiv\.org/(?:abs|pdf|html)/((?:\d{4}\.\d{4,5})|(?:[a-z\-]+(?:\.[A-Z]{2})?/\d{7}))(?:v\d+)?',
+    re.IGNORECASE
+)
+
+def paper_keys(paper=None, url=None):
+    """論文を識別するキーの集合（バージョンなしのarXiv ID・DOI・URL）"""
+    urls = [url] if url else []
+    doi = None
+    if paper is not None:
+        urls.extend(u for u in (paper.get('url'), paper.get('pdf_url')) if u)
+        doi = paper.get('doi')
+
+    keys = set()
+    for u in urls:
+        match = ARXIV_URL_PATTERN.search(u)
+        if match:
+            keys.add('arxiv:' + match.group(1).lower())
+        keys.add('url:' + u.strip().rstrip('/'))
+    if doi:
+        keys.add('doi:' + doi.strip().lower())
+    return keys
+
+class SeenPaperIndex:
+    """処理済み論文のローカルインデックス（SQLite）
+
+    起動のたびにNotionのデータベースを全件取得する代わりに、処理済みの論文をローカルに記録し、
+    バージョンなしのarXiv ID・DOI・URLのいずれかが一致すれば処理済みと判定する。
+    Notionとの突き合わせは、前回の同期以降に作成・編集されたページのみを取得する。
+    """
+
+    def __init__(self, db_path="./cache/seen_papers.sqlite"):
+        self.db_path = db_path
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " key TEXT PRIMARY KEY,"
+            " source TEXT NOT NULL,"
+            " added_at REAL NOT NULL)"
+        )
+        # 同期状態など（名前 → 値）
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def contains(self, paper=None, url=None):
+        """いずれかのキーが記録済みか"""
+        keys = list(paper_keys(paper, url))
+        if not keys:
+            return False
+        row = self.conn.execute(
+            f"SELECT 1 FROM seen WHERE key IN ({','.join('?' * len(keys))}) LIMIT 1", keys
+        ).fetchone()
+        return row is not None
+
+    def add(self, paper=None, url=None, source='local'):
+        """論文のキーを記録"""
+        self.add_keys(paper_keys(paper, url), source)
+
+    def add_urls(self, urls, source='notion'):
+        """URLの一覧をまとめて記録（Notionとの突き合わせ用）"""
+        keys = set()
+        for url in urls:
+            keys.update(paper_keys(url=url))
+        self.add_keys(keys, source)
+        return len(keys)
+
+    def add_keys(self, keys, source='local'):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO seen (key, source, added_at) VALUES (?, ?, ?)",
+            [(key, source, now) for key in keys]
+        )
+        self.conn.commit()
+
+    def remove(self, paper=None, url=None, source='notion'):
+        """指定した記録元の論文のキーを削除（保存できなかった論文を再び処理対象にする）"""
+        keys = list(paper_keys(paper, url))
+        if not keys:
+            return
+        self.conn.execute(
+            f"DELETE FROM seen WHERE source = ? AND key IN ({','.join('?' * len(keys))})", [source] + keys
+        )
+        self.conn.commit()
+
+    def get_meta(self, name, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, name, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+        self.conn.commit()
+
+    @property
+    def notion_cursor(self):
+        """Notionとの前回の同期カーソル（未同期ならNone）"""
+        return self.get_meta('notion_cursor')
+
+    def sync_due(self, interval):
+        """前回の同期から interval 秒以上経過したか（未同期なら常にTrue）"""
+        synced_at = self.get_meta('notion_synced_at')
+        return synced_at is None or time.time() - float(synced_at) >= interval
+
+    def mark_synced(self, cursor):
+        """同期カーソルと同期時刻を記録"""
+        if cursor:
+            self.set_meta('notion_cursor', cursor)
+        self.set_meta('notion_synced_at', str(time.time()))
+
+    def close(self):
+        self.conn.close()
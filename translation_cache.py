@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+# 文の区切り（文末の記号の後の空白で、次が大文字・数字・括弧で始まる位置）
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9(\[])')
+
+# 文末ではないピリオドで終わる略語（小文字で比較）
+ABBREVIATIONS = {
+    'al.', 'e.g.', 'i.e.', 'cf.', 'etc.', 'vs.', 'approx.', 'resp.',
+    'fig.', 'figs.', 'eq.', 'eqs.', 'sec.', 'sect.', 'ref.', 'refs.', 'tab.', 'no.',
+}
+
+# 名前のイニシャル（"J. Smith" など）
+INITIAL = re.compile(r'^[A-Z]\.$')
+
+def normalize_text(text):
+    """空白を正規化（改行や連続する空白を1つの空白に）"""
+    return ' '.join(text.split())
+
+def split_sentences(text):
+    """文単位に分割（略語やイニシャルの後では区切らない）"""
+    sentences = []
+    for piece in SENTENCE_BOUNDARY.split(normalize_text(text)):
+        if not piece:
+            continue
+        if sentences:
+            last_word = sentences[-1].rsplit(' ', 1)[-1]
+            if last_word.lower() in ABBREVIATIONS or INITIAL.match(last_word):
+                sentences[-1] += ' ' + piece
+                continue
+        sentences.append(piece)
+    return sentences
+
+class TranslationCache:
+    """翻訳結果のキャッシュ（SQLite）
+
+    キーは正規化した原文・翻訳先言語・オプションのハッシュなので、
+    同じ文章はどの論文・どの実行から翻訳しても1回分の文字数しか消費しない。
+    """
+
+    def __init__(self, db_path="./cache/translations.sqlite"):
+        self.db_path = db_path
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " key TEXT PRIMARY KEY,"
+            " source TEXT NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def build_key(text, target_lang, options=None):
+        payload = '\0'.join([target_lang.upper(), json.dumps(options or {}, sort_keys=True), normalize_text(text)])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_many(self, texts, target_lang, options=None):
+        """キャッシュ済みの翻訳を取得（{原文: 翻訳}、未翻訳の原文は含まない）"""
+        keys = {self.build_key(text, target_lang, options): text for text in texts}
+        found = {}
+        key_list = list(keys)
+        # SQLiteのパラメータ数の上限に収まるように分けて検索
+        for start in range(0, len(key_list), 500):
+            chunk = key_list[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT key, translation FROM translations WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for key, translation in rows:
+                found[keys[key]] = translation
+        return found
+
+    def get(self, text, target_lang, options=None):
+        return self.get_many([text], target_lang, options).get(text)
+
+    def put_many(self, translations, target_lang, options=None):
+        """翻訳結果を保存（{原文: 翻訳}）"""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO translations (key, source, translation, created_at) VALUES (?, ?, ?, ?)",
+            [
+                (self.build_key(text, target_lang, options), normalize_text(text), translation, now)
+                for text, translation in translations.items()
+            ]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
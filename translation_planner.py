@@ -0,0 +1,83 @@
+import math
+import numpy as np
+from translation_cache import split_sentences
+
+class TranslationPlanner:
+    """DeepLの残り文字数の中で、どの論文の要約をどこまで翻訳するかを決める
+
+    論文ごとに「全文翻訳」「冒頭の数文のみ翻訳」「翻訳しない」から1つを選ぶ
+    多選択ナップサック問題として、関連度スコアの合計が最大になる組み合わせを動的計画法で求める。
+    費用はキャッシュにない文の文字数なので、翻訳済みの文を含む論文は安く翻訳できる。
+    要約を翻訳する論文はタイトルも一緒に翻訳するため、その費用も含める。
+    """
+
+    def __init__(self, cost_fn=None, partial_sentences=(1, 2, 3), partial_weight=0.8, max_units=5000):
+        # cost_fn: 文のリストの翻訳に必要な文字数を返す関数（省略時は文字数そのもの）
+        self.cost_fn = cost_fn or (lambda sentences: sum(len(sentence) for sentence in sentences))
+        self.partial_sentences = partial_sentences
+        # 冒頭のみの翻訳の価値（全文翻訳に対する割合を文字数の比率に掛ける）
+        self.partial_weight = partial_weight
+        # 動的計画法の表の最大サイズ（残り文字数をこの数の単位に丸める）
+        self.max_units = max_units
+
+    def options(self, abstract, score, title=None):
+        """論文ごとの選択肢 [(モード, 文数, 費用, 価値), ...]"""
+        sentences = split_sentences(abstract or '')
+        options = [('none', 0, 0, 0.0)]
+        if not sentences:
+            return options
+
+        title_cost = self.cost_fn([title]) if title else 0
+
+        total_chars = sum(len(sentence) for sentence in sentences)
+        for count in self.partial_sentences:
+            if count >= len(sentences):
+                break
+            chars = sum(len(sentence) for sentence in sentences[:count])
+            options.append(('partial', count, self.cost_fn(sentences[:count]) + title_cost,
+                            score * self.partial_weight * chars / total_chars))
+        options.append(('full', len(sentences), self.cost_fn(sentences) + title_cost, float(score)))
+        return options
+
+    def plan(self, papers, scores, budget):
+        """論文ごとの翻訳方法のリスト [(モード, 文数), ...] を返す（モードは 'full' / 'partial' / 'none'）"""
+        all_options = [
+            self.options(paper.get('abstract', ''), score, paper.get('title')) for paper, score in zip(papers, scores)
+        ]
+
+        # すべて全文翻訳できるなら最適化は不要
+        full_cost = sum(options[-1][2] for options in all_options)
+        if full_cost <= budget:
+            return [(options[-1][0], options[-1][1]) for options in all_options]
+
+        # 費用を単位に切り上げて、表のサイズを抑える（切り上げなので予算は超えない）
+        unit = max(1, math.ceil(budget / self.max_units))
+        capacity = budget // unit
+
+        # best[c]: 費用c以内で得られる価値の最大値
+        best = np.zeros(capacity + 1)
+        choices = []
+        for options in all_options:
+            new_best = np.full(capacity + 1, -np.inf)
+            choice = np.zeros(capacity + 1, dtype=np.int64)
+            for index, (_, _, cost, value) in enumerate(options):
+                units = math.ceil(cost / unit)
+                if units > capacity:
+                    continue
+                candidate = np.full(capacity + 1, -np.inf)
+                candidate[units:] = best[:capacity + 1 - units] + value
+                better = candidate > new_best
+                new_best[better] = candidate[better]
+                choice[better] = index
+            best = new_best
+            choices.append(choice)
+
+        # 選択を逆順にたどる
+        plan = []
+        remaining = capacity
+        for options, choice in zip(reversed(all_options), reversed(choices)):
+            mode, count, cost, _ = options[choice[remaining]]
+            plan.append((mode, count))
+            remaining -= math.ceil(cost / unit)
+        plan.reverse()
+        return plan
@@ -0,0 +1,42 @@
+import json
+import os
+
+class WatermarkStore:
+    """キーワードごとの取得済み最新日時（ハイウォーターマーク）を保存する"""
+
+    def __init__(self, store_path="./cache/watermarks.json"):
+        self.store_path = store_path
+        self._marks = self._load()
+
+    def _load(self):
+        """保存済みのウォーターマークを読み込む"""
+        try:
+            if os.path.exists(self.store_path):
+                with open(self.store_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Watermark load error: {e}")
+        return {}
+
+    def get(self, key):
+        """ウォーターマークを取得（未設定ならNone）"""
+        return self._marks.get(key)
+
+    def advance(self, key, value):
+        """より新しい値の場合のみウォーターマークを進める"""
+        if value and (key not in self._marks or value > self._marks[key]):
+            self._marks[key] = value
+
+    def save(self):
+        """ウォーターマークをファイルに書き出す"""
+        try:
+            store_dir = os.path.dirname(self.store_path)
+            if store_dir and not os.path.exists(store_dir):
+                os.makedirs(store_dir)
+
+            tmp_path = self.store_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._marks, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.store_path)
+        except Exception as e:
+            print(f"⚠️ Watermark save error: {e}")